@@ -1,20 +1,10 @@
 from flask import Flask, render_template, Response, jsonify, request, send_file, send_from_directory
 import cv2
-import math
-import cvzone
 import json
 from datetime import datetime, timedelta
 import os
-import torch
 import numpy as np
 from werkzeug.utils import secure_filename
-from ultralytics.nn.tasks import DetectionModel
-from torch.nn.modules.container import Sequential
-from ultralytics.nn.modules.conv import Conv
-from torch.nn.modules.conv import Conv2d
-from torch.nn.modules.batchnorm import BatchNorm2d
-from torch.nn import SiLU, Upsample
-from ultralytics.nn.modules import C2f, SPPF, Detect
 import base64
 import time
 from flask_cors import CORS
@@ -23,25 +13,22 @@ import sqlite3
 from sqlite3 import Error
 import urllib.parse
 import re
-
-# Override torch_safe_load in ultralytics to use weights_only=False
-# Only do this if you fully trust your model file
-def torch_safe_load_override(file):
-    ckpt = torch.load(file, map_location="cpu", weights_only=False)
-    return ckpt, file  # Return both the checkpoint and the file path
-
-# Patch the function in the ultralytics library
-import ultralytics.nn.tasks
-ultralytics.nn.tasks.torch_safe_load = torch_safe_load_override
-
-# Now import YOLO after the patch
-from ultralytics import YOLO
-
-# Add all necessary classes to safe globals
-torch.serialization.add_safe_globals([
-    DetectionModel, Sequential, Conv, Conv2d, BatchNorm2d,
-    SiLU, Upsample, C2f, SPPF, Detect
-])
+import threading
+import queue
+import signal
+import uuid
+import itertools
+import atexit
+import collections
+import bisect
+import concurrent.futures
+import subprocess
+import sys
+import multiprocessing
+from multiprocessing import shared_memory
+import hashlib
+import functools
+import struct
 
 app = Flask(__name__, static_folder='static', static_url_path='')
 # Enable CORS for all routes
@@ -62,8 +49,386 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['PROCESSED_FOLDER'] = PROCESSED_FOLDER
 app.config['PROCESSED_PHOTOS_FOLDER'] = PROCESSED_PHOTOS_FOLDER
 
-# Load YOLO model with custom weights
-yolo_model = YOLO("Weights/best.pt")
+# Which runtime runs the detector: 'torch' (ultralytics on PyTorch), 'onnx' (ONNX Runtime
+# on an export of the same weights, without importing torch at all) or 'onnx-int8'
+# (the ONNX export statically quantized to INT8, for CPU-only hosts)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+
+# Inference worker processes and the ONNX export child (INFERENCE_BACKEND=none) import this
+# module only for its model code, so they skip the server's start-up side effects
+SERVER_PROCESS = multiprocessing.parent_process() is None and INFERENCE_BACKEND != 'none'
+
+# PyTorch weights; the ONNX export is cached next to them with an .onnx suffix
+MODEL_WEIGHTS = os.environ.get('MODEL_WEIGHTS', 'Weights/best.pt')
+
+# Size the model input is letterboxed to, as in ultralytics' predictor
+MODEL_IMAGE_SIZE = int(os.environ.get('MODEL_IMAGE_SIZE', 640))
+
+# Letterbox every input to the full MODEL_IMAGE_SIZE square instead of trimming the
+# padding per image, so the model only ever sees one input shape
+MODEL_FIXED_INPUT = os.environ.get('MODEL_FIXED_INPUT', 'false').lower() == 'true'
+
+# Threads each model copy may use; 0 leaves it to the runtime (normally every core)
+MODEL_THREADS = int(os.environ.get('MODEL_THREADS', 0))
+
+# ONNX Runtime execution providers in order of preference, e.g.
+# 'OpenVINOExecutionProvider,CPUExecutionProvider' with onnxruntime-openvino installed
+ONNX_PROVIDERS = os.environ.get('ONNX_PROVIDERS', 'CPUExecutionProvider').split(',')
+
+# ultralytics' predictor defaults, reproduced by the ONNX backend's postprocessing
+MODEL_CONFIDENCE = 0.25
+MODEL_IOU = 0.7
+MODEL_MAX_DETECTIONS = 300
+MODEL_STRIDE = 32
+
+class Boxes:
+    """Detection boxes of one image as numpy arrays.
+    
+    Iterating yields one-box Boxes, so `box.xyxy[0]`, `box.conf[0]` and `box.cls[0]`
+    work the same whichever backend produced them.
+    """
+    
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+    
+    def __len__(self):
+        return len(self.conf)
+    
+    def __iter__(self):
+        for i in range(len(self.conf)):
+            yield Boxes(self.xyxy[i:i + 1], self.conf[i:i + 1], self.cls[i:i + 1])
+
+class DetectionResult:
+    """Backend independent detections for one image"""
+    
+    def __init__(self, boxes, orig_shape):
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+
+def load_torch_model(weights):
+    """Load the weights with ultralytics YOLO; the only place torch is imported"""
+    import torch
+    from torch.nn.modules.container import Sequential
+    from torch.nn.modules.conv import Conv2d
+    from torch.nn.modules.batchnorm import BatchNorm2d
+    from torch.nn import SiLU, Upsample
+    from ultralytics.nn.tasks import DetectionModel
+    from ultralytics.nn.modules.conv import Conv
+    from ultralytics.nn.modules import C2f, SPPF, Detect
+    
+    # Override torch_safe_load in ultralytics to use weights_only=False
+    # Only do this if you fully trust your model file
+    def torch_safe_load_override(file):
+        ckpt = torch.load(file, map_location="cpu", weights_only=False)
+        return ckpt, file  # Return both the checkpoint and the file path
+    
+    # Patch the function in the ultralytics library
+    import ultralytics.nn.tasks
+    ultralytics.nn.tasks.torch_safe_load = torch_safe_load_override
+    
+    # Now import YOLO after the patch
+    from ultralytics import YOLO
+    
+    # Add all necessary classes to safe globals
+    torch.serialization.add_safe_globals([
+        DetectionModel, Sequential, Conv, Conv2d, BatchNorm2d,
+        SiLU, Upsample, C2f, SPPF, Detect
+    ])
+    
+    return YOLO(weights)
+
+class TorchDetector:
+    """Runs the weights through ultralytics and PyTorch"""
+    
+    def __init__(self, weights, fixed_input=MODEL_FIXED_INPUT, threads=0):
+        self.model = load_torch_model(weights)
+        self.fixed_input = fixed_input
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+    
+    def __call__(self, source):
+        results = []
+        # rect=False makes ultralytics pad to the full square rather than to the stride
+        for result in self.model(source, rect=not self.fixed_input):
+            boxes = result.boxes
+            results.append(DetectionResult(
+                Boxes(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()),
+                result.orig_shape))
+        return results
+
+# Run by export_onnx_model in a child process, so exporting never loads torch into the server
+ONNX_EXPORT_SCRIPT = '''
+import sys
+sys.path.insert(0, sys.argv[1])
+from app import load_torch_model
+load_torch_model(sys.argv[2]).export(format="onnx", imgsz=int(sys.argv[3]), dynamic=True, simplify=False)
+'''
+
+def export_onnx_model(weights=MODEL_WEIGHTS):
+    """Path of the ONNX export of the weights, exporting them first if the cached copy is missing or stale"""
+    onnx_path = os.path.splitext(weights)[0] + '.onnx'
+    if os.path.exists(onnx_path) and not (os.path.exists(weights) and
+                                          os.path.getmtime(weights) > os.path.getmtime(onnx_path)):
+        return onnx_path
+    
+    print(f"Exporting {weights} to {onnx_path}")
+    subprocess.run([sys.executable, '-c', ONNX_EXPORT_SCRIPT, os.path.dirname(os.path.abspath(__file__)),
+                    weights, str(MODEL_IMAGE_SIZE)],
+                   env={**os.environ, 'INFERENCE_BACKEND': 'none'}, check=True)
+    return onnx_path
+
+def letterbox_image(image, image_size, auto):
+    """Resize keeping the aspect ratio and pad to the model size (or just to the stride if auto)"""
+    height, width = image.shape[:2]
+    ratio = min(image_size / height, image_size / width)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+    pad_width, pad_height = image_size - new_width, image_size - new_height
+    if auto:
+        pad_width, pad_height = pad_width % MODEL_STRIDE, pad_height % MODEL_STRIDE
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_height / 2 - 0.1), round(pad_height / 2 + 0.1)
+    left, right = round(pad_width / 2 - 0.1), round(pad_width / 2 + 0.1)
+    if top or bottom or left or right:
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return image
+
+def preprocess_images(images, image_size=MODEL_IMAGE_SIZE, fixed_input=MODEL_FIXED_INPUT):
+    """Letterbox BGR images into one normalised RGB NCHW float32 batch"""
+    # Like ultralytics, only trim the padding to the stride when every image has the same shape
+    auto = not fixed_input and len({image.shape for image in images}) == 1
+    batch = np.stack([letterbox_image(image, image_size, auto) for image in images])
+    return np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2)).astype(np.float32) / 255
+
+class OnnxDetector:
+    """Runs the exported model with ONNX Runtime, reproducing ultralytics' letterbox and NMS"""
+    
+    def __init__(self, path, providers=ONNX_PROVIDERS, image_size=MODEL_IMAGE_SIZE, fixed_input=MODEL_FIXED_INPUT,
+                 threads=0):
+        import onnxruntime
+        available = onnxruntime.get_available_providers()
+        providers = [provider for provider in providers if provider in available] or ['CPUExecutionProvider']
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.image_size = image_size
+        self.fixed_input = fixed_input
+    
+    def postprocess(self, output, input_shape, orig_shape):
+        # One row of (cx, cy, w, h, class scores...) per anchor
+        predictions = output.T
+        scores = predictions[:, 4:]
+        cls = scores.argmax(1)
+        conf = scores[np.arange(len(cls)), cls]
+        keep = conf > MODEL_CONFIDENCE
+        predictions, cls, conf = predictions[keep], cls[keep], conf[keep]
+        
+        xyxy = np.empty((len(predictions), 4), dtype=np.float32)
+        xyxy[:, :2] = predictions[:, :2] - predictions[:, 2:4] / 2
+        xyxy[:, 2:] = predictions[:, :2] + predictions[:, 2:4] / 2
+        
+        # Shift each class far apart so one NMS pass never suppresses across classes
+        offset = cls[:, None].astype(np.float32) * 7680
+        rects = np.concatenate([xyxy[:, :2] + offset, xyxy[:, 2:] - xyxy[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), conf.tolist(), MODEL_CONFIDENCE, MODEL_IOU)
+        indices = np.array(indices, dtype=np.int64).reshape(-1)[:MODEL_MAX_DETECTIONS]
+        xyxy, conf, cls = xyxy[indices], conf[indices], cls[indices]
+        
+        # Undo the letterbox, using the rounded size each side was resized to
+        gain = min(input_shape[0] / orig_shape[0], input_shape[1] / orig_shape[1])
+        new_height, new_width = round(orig_shape[0] * gain), round(orig_shape[1] * gain)
+        pad_x = round((input_shape[1] - new_width) / 2 - 0.1)
+        pad_y = round((input_shape[0] - new_height) / 2 - 0.1)
+        xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad_x) / (new_width / orig_shape[1])
+        xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad_y) / (new_height / orig_shape[0])
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, orig_shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, orig_shape[0])
+        return DetectionResult(Boxes(xyxy, conf, cls.astype(np.float32)), orig_shape)
+    
+    def __call__(self, source):
+        images = source if isinstance(source, list) else [source]
+        images = [cv2.imread(image) if isinstance(image, str) else image for image in images]
+        blob = preprocess_images(images, self.image_size, self.fixed_input)
+        outputs = self.session.run(None, {self.input_name: blob})[0]
+        return [self.postprocess(output, blob.shape[2:], image.shape[:2]) for output, image in zip(outputs, images)]
+
+# Folders of sample images that calibrate the INT8 model's activation ranges
+QUANTIZE_CALIBRATION_DIRS = os.environ.get('QUANTIZE_CALIBRATION_DIRS', 'Media,processed_photos').split(',')
+
+# Most calibration images used
+QUANTIZE_CALIBRATION_IMAGES = int(os.environ.get('QUANTIZE_CALIBRATION_IMAGES', 100))
+
+def calibration_images(folders=QUANTIZE_CALIBRATION_DIRS, limit=QUANTIZE_CALIBRATION_IMAGES):
+    """Readable images from the calibration folders, in a stable order"""
+    images = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            image = cv2.imread(os.path.join(folder, name))
+            if image is not None:
+                images.append(image)
+                if len(images) >= limit:
+                    return images
+    return images
+
+def quantize_onnx_model(weights=MODEL_WEIGHTS):
+    """Path of the static INT8 copy of the ONNX export, calibrating and quantizing it first if needed"""
+    onnx_path = export_onnx_model(weights)
+    int8_path = os.path.splitext(onnx_path)[0] + '.int8.onnx'
+    if os.path.exists(int8_path) and os.path.getmtime(int8_path) >= os.path.getmtime(onnx_path):
+        return int8_path
+    
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    
+    images = calibration_images()
+    if not images:
+        raise RuntimeError(f"No calibration images found in {', '.join(QUANTIZE_CALIBRATION_DIRS)}")
+    
+    class CalibrationImages(CalibrationDataReader):
+        def __init__(self):
+            self.blobs = ({'images': preprocess_images([image])} for image in images)
+        
+        def get_next(self):
+            return next(self.blobs, None)
+    
+    import onnx
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    
+    # Fold constants and infer shapes first so every Conv bias is an initializer
+    prepared_path = os.path.splitext(int8_path)[0] + '.prepared.onnx'
+    quant_pre_process(onnx_path, prepared_path, skip_symbolic_shape=True)
+    
+    # The Detect head (the last model.N block) decodes boxes into one tensor that mixes
+    # pixel coordinates with 0-1 scores, which a single INT8 scale cannot represent, so
+    # only its convolutions are quantized and the decoding stays in float
+    nodes = onnx.load(prepared_path).graph.node
+    blocks = [int(match.group(1)) for match in (re.match(r'/model\.(\d+)/', node.name) for node in nodes) if match]
+    head = f'/model.{max(blocks)}/' if blocks else None
+    excluded = [node.name for node in nodes if head and node.name.startswith(head) and node.op_type != 'Conv']
+    
+    print(f"Quantizing {onnx_path} to {int8_path} with {len(images)} calibration images")
+    try:
+        quantize_static(prepared_path, int8_path, CalibrationImages(), quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True,
+                        nodes_to_exclude=excluded)
+    finally:
+        os.remove(prepared_path)
+    return int8_path
+
+def model_file(backend=INFERENCE_BACKEND, weights=MODEL_WEIGHTS):
+    """The file the backend loads: the weights, or their ONNX (INT8) export, created first if needed"""
+    if backend == 'onnx':
+        return export_onnx_model(weights)
+    if backend == 'onnx-int8':
+        return quantize_onnx_model(weights)
+    return weights
+
+def load_model(backend=INFERENCE_BACKEND, weights=MODEL_WEIGHTS, threads=None, path=None):
+    """Load the detector for the configured inference backend, from path if model_file already gave it"""
+    threads = MODEL_THREADS if threads is None else threads
+    if backend == 'none':
+        # Only the ONNX export child process asks for no model at all
+        return None
+    if backend not in ('torch', 'onnx', 'onnx-int8'):
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}', expected 'torch', 'onnx' or 'onnx-int8'")
+    path = path or model_file(backend, weights)
+    if backend == 'torch':
+        return TorchDetector(path, threads=threads)
+    return OnnxDetector(path, threads=threads)
+
+# Load the model in a background thread at startup rather than on the first inference
+MODEL_WARMUP = os.environ.get('MODEL_WARMUP', 'true').lower() == 'true'
+
+def parse_frame_sizes(value):
+    """Parse '640x480,1280x720' into [(640, 480), (1280, 720)]"""
+    sizes = []
+    for size in value.split(','):
+        width, height = size.lower().strip().split('x')
+        sizes.append((int(width), int(height)))
+    return sizes
+
+# Frame sizes (width x height) run through the model during warm-up, so the first real
+# requests at those sizes do not pay for graph setup and allocator growth
+MODEL_WARMUP_SIZES = parse_frame_sizes(os.environ.get('MODEL_WARMUP_SIZES', '640x480,1280x720'))
+
+# Dummy inferences per warm-up size
+MODEL_WARMUP_RUNS = int(os.environ.get('MODEL_WARMUP_RUNS', 2))
+
+# The model is loaded on first use (or by the warm-up thread), so starting the server
+# and serving requests that never touch it do not pay for loading it
+yolo_model = None
+model_load_lock = threading.Lock()
+
+# In inference worker processes, the model file the server exported or quantized for them
+worker_model_path = None
+model_status = {'loaded': False, 'load_seconds': None, 'warmed_up': False, 'warmup_seconds': None, 'error': None}
+model_warmup_thread = None
+
+def get_model():
+    """The detector for INFERENCE_BACKEND, loading it on first use"""
+    global yolo_model
+    if yolo_model is None:
+        with model_load_lock:
+            if yolo_model is None:
+                start = time.perf_counter()
+                try:
+                    model = load_model(path=worker_model_path)
+                except Exception as e:
+                    model_status['error'] = str(e)
+                    raise
+                model_status.update(loaded=True, load_seconds=round(time.perf_counter() - start, 2), error=None)
+                yolo_model = model
+    return yolo_model
+
+def warm_up(model):
+    """Run dummy frames through the model at every warm-up size and return the sizes used"""
+    # With a fixed input size every frame reaches the model with the same shape
+    sizes = MODEL_WARMUP_SIZES[:1] if MODEL_FIXED_INPUT else MODEL_WARMUP_SIZES
+    for width, height in sizes:
+        frame = np.full((height, width, 3), 114, dtype=np.uint8)
+        for _ in range(MODEL_WARMUP_RUNS):
+            model(frame)
+    # Also a full scheduler batch, whose shape differs from a single frame's
+    model([frame] * INFERENCE_MAX_BATCH)
+    return sizes
+
+def warm_up_model():
+    """Load the model, then run dummy frames at every warm-up size before reporting ready"""
+    try:
+        if INFERENCE_WORKERS:
+            # Each worker process loads and warms up its own copy
+            inference_scheduler.start()
+            inference_scheduler.wait_ready()
+            if model_status['error']:
+                raise RuntimeError(model_status['error'])
+            print(f"{INFERENCE_WORKERS} inference workers ({INFERENCE_BACKEND}) ready in "
+                  f"{model_status['load_seconds']}s + {model_status['warmup_seconds']}s warm-up")
+            return
+        
+        model = get_model()
+        print(f"Model loaded ({INFERENCE_BACKEND}) in {model_status['load_seconds']}s")
+        start = time.perf_counter()
+        with model_lock:
+            sizes = warm_up(model)
+        model_status.update(warmed_up=True, warmup_seconds=round(time.perf_counter() - start, 2))
+        print(f"Model warmed up at {sizes} in {model_status['warmup_seconds']}s")
+    except Exception as e:
+        model_status['error'] = str(e)
+        print(f"Error loading model: {e}")
+
+def start_model_warmup():
+    """Load the model in the background if MODEL_WARMUP is on; safe to call more than once"""
+    global model_warmup_thread
+    with model_load_lock:
+        if MODEL_WARMUP and model_warmup_thread is None and yolo_model is None:
+            model_warmup_thread = threading.Thread(target=warm_up_model, name='model-warmup', daemon=True)
+            model_warmup_thread.start()
 
 # Define class names
 class_labels = ['0', 'c', 'garbage', 'garbage_bag', 'sampah-detection', 'trash']
@@ -75,9 +440,113 @@ if not os.path.exists('logs'):
 # Store detection history
 detection_history = []
 
-# Track the last time a detection was logged for cleaning
-last_cleaning_log_time = 0
-CLEANING_LOG_INTERVAL = 60  # seconds
+# Most recent detections kept in detection_history; older ones are only in the database
+DETECTION_HISTORY_SIZE = 100
+
+# Every new or changed detection_history entry is stamped with the next version so
+# polling clients can ask for just the changes since the last version they saw
+history_version = 0
+history_reset_version = 0
+history_version_lock = threading.Lock()
+
+# Versions start again at 0 in every server process, so ETags and delta responses also
+# carry this id, and clients resync fully when it changes
+BOOT_ID = uuid.uuid4().hex
+
+def mark_detection_changed(detection):
+    """Stamp a new or changed detection with the next history version.
+    
+    A new detection also gets its event_id from that first version. Timestamps are not
+    unique: every object found in the same frame shares the second it was seen in.
+    """
+    global history_version
+    with history_version_lock:
+        history_version += 1
+        detection['version'] = history_version
+        detection.setdefault('event_id', history_version)
+    return detection
+
+def mark_history_reset():
+    """Record that detection_history was replaced, so delta clients have to resync fully"""
+    global history_version, history_reset_version
+    with history_version_lock:
+        history_version += 1
+        history_reset_version = history_version
+
+# Events buffered per push subscriber; once a client falls this far behind the oldest are dropped
+EVENT_BUFFER_SIZE = int(os.environ.get('EVENT_BUFFER_SIZE', 100))
+
+class EventSubscription:
+    """One push client's filter and bounded, drop-oldest event buffer"""
+    
+    def __init__(self, zone=None, camera=None, buffer_size=EVENT_BUFFER_SIZE):
+        self.zone = zone
+        self.camera = camera
+        self.events = collections.deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.condition = threading.Condition()
+    
+    def wants(self, detection):
+        # A bulk summary lists every zone and camera it covers
+        zones = detection.get('zones', [detection.get('zone_name')])
+        cameras = detection.get('cameras', [detection.get('camera_id')])
+        return (not self.zone or self.zone in zones) and (not self.camera or self.camera in cameras)
+    
+    def push(self, event):
+        with self.condition:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            self.condition.notify()
+    
+    def wait(self, timeout):
+        """Take every buffered event, waiting up to timeout seconds for one to arrive"""
+        with self.condition:
+            if not self.events:
+                self.condition.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+            dropped, self.dropped = self.dropped, 0
+            return events, dropped
+
+class EventBroker:
+    """Fans detection and status events out to push subscribers without blocking the publisher"""
+    
+    def __init__(self):
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+    
+    def subscribe(self, zone=None, camera=None):
+        subscription = EventSubscription(zone, camera)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+    
+    def publish(self, event_type, detection):
+        with self.lock:
+            subscriptions = [sub for sub in self.subscriptions if sub.wants(detection)]
+        if not subscriptions:
+            return
+        
+        event = {'type': event_type, 'id': detection.get('version'), 'detection': detection.copy()}
+        for subscription in subscriptions:
+            subscription.push(event)
+
+event_broker = EventBroker()
+
+# Boxes in consecutive frames are treated as the same object when they overlap this much
+TRACK_IOU_THRESHOLD = float(os.environ.get('TRACK_IOU_THRESHOLD', 0.3))
+
+# Seconds an object can go unseen before a new sighting starts a new event
+TRACK_TIMEOUT = float(os.environ.get('TRACK_TIMEOUT', 30))
+
+# Seconds between version bumps for a tracked object that is only seen again; a new peak
+# confidence is published at once, last_seen and frames_seen at most this often
+TRACK_VERSION_INTERVAL = float(os.environ.get('TRACK_VERSION_INTERVAL', 60))
 
 # Global variables
 DETECTION_FOLDER = 'detections'
@@ -87,9 +556,11 @@ if not os.path.exists(DETECTION_FOLDER):
 # List to store detection results
 detections = []
 
-# Configuration for camera zones
+# Configuration for camera zones. 'source' is what cv2.VideoCapture opens: a device
+# index, an RTSP/HTTP stream URL or a video file path (files are looped)
 CAMERA_ZONES = {
     'camera_0': {
+        'source': 0,
         'zone_name': 'Zone 1',
         'location': 'Main Entrance',
         'description': 'Camera monitoring the main entrance area'
@@ -103,107 +574,914 @@ current_camera_id = 'camera_0'
 # Add global variable for location override
 current_zone_override = None
 
-def process_frame(frame):
-    # Perform detection
-    results = yolo_model(frame)
+# Number of video frames decoded and sent to the inference scheduler together; the
+# scheduler runs them in forward passes of at most INFERENCE_MAX_BATCH frames
+VIDEO_BATCH_SIZE = int(os.environ.get('VIDEO_BATCH_SIZE', 8))
+
+# Number of frame batches buffered between the video decode, inference and encode stages
+VIDEO_QUEUE_SIZE = int(os.environ.get('VIDEO_QUEUE_SIZE', 4))
+
+# Which video frames get inference: 1 for every frame, N for every Nth frame, or
+# 'auto' to run it again once the scene has changed enough since the last inferred frame
+VIDEO_STRIDE = os.environ.get('VIDEO_STRIDE', '1')
+
+# Mean grey-level difference (0-255) between frames that makes 'auto' run inference again
+VIDEO_STRIDE_DIFF_THRESHOLD = float(os.environ.get('VIDEO_STRIDE_DIFF_THRESHOLD', 6.0))
+
+# Most frames in a row that 'auto' may reuse the previous boxes for
+VIDEO_MAX_STRIDE = int(os.environ.get('VIDEO_MAX_STRIDE', 15))
+
+# The YOLO predictor keeps per-call state, so only one thread may run it at a time
+model_lock = threading.Lock()
+
+# Most frames the inference scheduler puts into one forward pass. Defaults to
+# VIDEO_BATCH_SIZE so a video batch runs as one pass; larger video batches are split
+INFERENCE_MAX_BATCH = int(os.environ.get('INFERENCE_MAX_BATCH', VIDEO_BATCH_SIZE))
+
+# Longest a frame waits for other frames to share its forward pass, in milliseconds
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 20))
+
+class LatencyHistogram:
+    """Counts latencies into fixed millisecond buckets"""
     
-    detection_found = False
-    current_detection = None
+    BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
     
-    # Process detections
-    for r in results:
-        boxes = r.boxes
-        for box in boxes:
-            x1, y1, x2, y2 = box.xyxy[0]
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-            w, h = x2 - x1, y2 - y1
-            
-            conf = math.ceil((box.conf[0] * 100)) / 100
-            cls = int(box.cls[0])
-            
-            if conf > 0.3:
-                detection_found = True
-                
-                # Draw bounding box
-                cvzone.cornerRect(frame, (x1, y1, w, h), t=2)
-                cvzone.putTextRect(frame, f'{class_labels[cls]} {conf}', (x1, y1 - 10), scale=0.8, thickness=1, colorR=(255, 0, 0))
-                
-                # Save detection to history
-                timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                image_filename = f'detection_{timestamp}.jpg'
-                image_path = os.path.join(UPLOAD_FOLDER, image_filename)
-                
-                # Save detection image
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.lock = threading.Lock()
+    
+    def observe(self, seconds):
+        ms = seconds * 1000
+        with self.lock:
+            self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+    
+    def snapshot(self):
+        with self.lock:
+            # A list rather than a dict so the buckets stay in order once serialized
+            buckets = [{'le_ms': bound, 'count': count} for bound, count in zip(self.BUCKETS_MS, self.counts)]
+            buckets.append({'le_ms': None, 'count': self.counts[-1]})
+            return {
+                'count': self.count,
+                'mean_ms': round(self.total_ms / self.count, 2) if self.count else None,
+                'buckets': buckets
+            }
+
+# Worker processes that each run their own copy of the model, so concurrent batches use
+# several cores instead of queueing behind one model; 0 runs the model in this process
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+
+def run_local_model(frames):
+    """Run a batch through the model loaded in this process"""
+    with model_lock:
+        return get_model()(frames)
+
+def inference_worker_main(conn, threads, model_path):
+    """Entry point of an inference worker process: run the batches the parent sends until it goes away"""
+    global MODEL_THREADS, worker_model_path
+    MODEL_THREADS = threads
+    worker_model_path = model_path
+    
+    # Ctrl+C reaches the whole process group; the server decides when its workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        start = time.perf_counter()
+        model = get_model()
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        if MODEL_WARMUP:
+            warm_up(model)
+        conn.send(('ready', round(load_seconds, 2), round(time.perf_counter() - start, 2)))
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return
+    
+    # Shared memory blocks this worker has mapped (the parent's batch block and camera
+    # rings), and the ones the parent has retired that are still to be unmapped
+    blocks = {}
+    retired = set()
+    while True:
+        try:
+            layout, dropped = conn.recv()
+        except EOFError:
+            return
+        retired.update(name for name in dropped if name in blocks)
+        try:
+            frames = []
+            for name, offset, shape in layout:
+                if name not in blocks:
+                    blocks[name] = shared_memory.SharedMemory(name=name)
+                frames.append(np.ndarray(shape, dtype=np.uint8, buffer=blocks[name].buf, offset=offset))
+            results = model(frames)
+            del frames
+
+            # Unmap only blocks the parent has retired (a grown batch block, a closed ring):
+            # cameras whose frames are just not in this batch keep their rings mapped
+            for name in list(retired):
                 try:
-                    cv2.imwrite(image_path, frame)
-                    print(f"Saved detection image to: {image_path}")
-                    
-                    # Check if file was actually saved
-                    if os.path.exists(image_path):
-                        print(f"File exists at: {image_path}")
-                    else:
-                        print(f"ERROR: File does not exist at: {image_path}")
+                    blocks[name].close()
+                except BufferError:
+                    # Still referenced, e.g. by the predictor's last batch; retry after the next one
+                    continue
+                del blocks[name]
+                retired.discard(name)
+            conn.send(('ok', [(r.boxes.xyxy, r.boxes.conf, r.boxes.cls, r.orig_shape) for r in results]))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+# Set when the interpreter starts exiting, after which dead worker processes are not replaced
+inference_shutdown = threading.Event()
+atexit.register(inference_shutdown.set)
+
+class InferenceWorker:
+    """An inference worker process and the shared memory block its frames are passed in.
+    
+    Each worker is driven by a single scheduler thread, so it needs no locking. Camera
+    frames already live in a shared FrameRing and are passed by location; other frames
+    are copied into the block rather than pickled. Only the small box arrays come back
+    through the pipe.
+    """
+    
+    def __init__(self, index, threads, model_path):
+        self.index = index
+        self.threads = threads
+        self.model_path = model_path
+        self.process = None
+        self.conn = None
+        self.block = None
+        self.ready = threading.Event()
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        # Names of shared memory blocks the worker should unmap, sent with the next batch
+        self.dropped = collections.deque()
+        atexit.register(self.release_block)
+    
+    def start(self):
+        """Start the worker process and wait until its model is loaded and warmed up"""
+        # Spawn rather than fork: the parent has camera, writer and scheduler threads running
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=inference_worker_main,
+                                       args=(child_conn, self.threads, self.model_path),
+                                       name=f'inference-worker-{self.index}', daemon=True)
+        self.process.start()
+        child_conn.close()
+        try:
+            message = self.conn.recv()
+        except EOFError:
+            message = ('error', f'Inference worker {self.index} exited while loading the model')
+        if message[0] == 'ready':
+            status, self.load_seconds, self.warmup_seconds = message
+            self.error = None
+        else:
+            self.error = message[1]
+        self.ready.set()
+    
+    def __call__(self, frames):
+        if self.error:
+            raise RuntimeError(self.error)
+        
+        # Frames already in a shared ring slot are passed by location; the rest are laid
+        # out back to back in this worker's block, which grows when a batch does not fit
+        copied = [frame for frame in frames if getattr(frame, 'shared_location', None) is None]
+        size = sum(frame.nbytes for frame in copied)
+        if size and (self.block is None or self.block.size < size):
+            new_size = max(size, 2 * self.block.size) if self.block else size
+            if self.block is not None:
+                self.dropped.append(self.block.name)
+            self.release_block()
+            self.block = shared_memory.SharedMemory(create=True, size=new_size)
+        layout = []
+        offset = 0
+        for frame in frames:
+            if getattr(frame, 'shared_location', None) is not None:
+                name, frame_offset = frame.shared_location
+                layout.append((name, frame_offset, frame.shape))
+                continue
+            frame = np.ascontiguousarray(frame, dtype=np.uint8)
+            np.ndarray(frame.shape, dtype=np.uint8, buffer=self.block.buf, offset=offset)[...] = frame
+            layout.append((self.block.name, offset, frame.shape))
+            offset += frame.nbytes
+        
+        dropped = [self.dropped.popleft() for _ in range(len(self.dropped))]
+        try:
+            self.conn.send((layout, dropped))
+            status, payload = self.conn.recv()
+        except (EOFError, OSError):
+            # The process died mid-batch; replace it before the next batch, unless it
+            # was stopped because the server is exiting
+            self.process.join(timeout=1)
+            if inference_shutdown.is_set():
+                raise RuntimeError(f'Inference worker {self.index} stopped at shutdown')
+            self.start()
+            raise RuntimeError(f'Inference worker {self.index} exited during a batch')
+        if status != 'ok':
+            raise RuntimeError(payload)
+        return [DetectionResult(Boxes(xyxy, conf, cls), orig_shape) for xyxy, conf, cls, orig_shape in payload]
+    
+    def release_block(self):
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+def forget_shared_block(name):
+    """Have every inference worker unmap a shared memory block the server no longer uses"""
+    for runner in inference_scheduler.runners:
+        if isinstance(runner, InferenceWorker):
+            runner.dropped.append(name)
+
+class InferenceScheduler:
+    """Micro-batches frames from every caller into shared YOLO forward passes.
+    
+    Only frames of the same shape share a batch, so every frame gets the same letterbox
+    padding, and so the same boxes, whatever else is in flight. A batch runs as soon as
+    it holds max_batch frames or its oldest frame has waited max_wait seconds, and each
+    caller gets back the result for its own frame. With worker processes, each worker
+    has its own dispatch thread and several batches run at once.
+    """
+    
+    def __init__(self, max_batch=INFERENCE_MAX_BATCH, max_wait=INFERENCE_MAX_WAIT_MS / 1000,
+                 workers=INFERENCE_WORKERS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers
+        self.runners = []
+        # Waiting (frame, future, submitted) requests per frame shape, oldest first
+        self.pending = {}
+        self.pending_condition = threading.Condition()
+        self.lock = threading.Lock()
+        self.queue_latency = LatencyHistogram()
+        self.inference_latency = LatencyHistogram()
+        self.batch_sizes = collections.Counter()
+    
+    def start(self):
+        """Start one dispatch thread per worker process, or one for the model in this process"""
+        with self.lock:
+            if self.runners:
+                return
+            if self.workers:
+                # Export or quantize the model once here, rather than in every worker at once
+                # where they would all write the same files
+                try:
+                    model_path = model_file()
                 except Exception as e:
-                    print(f"Error saving image: {e}")
-                
-                # Check if we should mark this detection for cleaning (once per minute)
-                global last_cleaning_log_time
-                current_time = time.time()
-                mark_for_cleaning = (current_time - last_cleaning_log_time) >= CLEANING_LOG_INTERVAL
-                
-                if mark_for_cleaning:
-                    last_cleaning_log_time = current_time
-                
-                # Get zone information - use override if available
-                global current_zone_override
-                if current_zone_override:
-                    zone_info = current_zone_override
-                else:
-                    zone_info = CAMERA_ZONES.get(current_camera_id, {'zone_name': 'Unknown Zone', 'location': 'Unknown Location'})
-                
-                detection = {
-                    'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'class': class_labels[cls],
-                    'confidence': conf,
-                    'status': 'pending',  # pending, cleaned
-                    'image_path': f'{UPLOAD_FOLDER}/{image_filename}',
-                    'forCleaning': mark_for_cleaning,
-                    'camera_id': current_camera_id,
-                    'zone_name': zone_info['zone_name'],
-                    'location': zone_info['location']
-                }
-                
-                # Extract coordinates if present in the location format "Name (lat, lng)"
-                location_coords_match = re.search(r'\(([-+]?[0-9]*\.?[0-9]+),\s*([-+]?[0-9]*\.?[0-9]+)\)', zone_info['location'])
-                if location_coords_match:
-                    detection['latitude'] = location_coords_match.group(1)
-                    detection['longitude'] = location_coords_match.group(2)
-                
-                current_detection = detection
-                
-                # Add to detection history
-                detection_history.append(detection)
-                print(f"Added detection to history: {detection}")
-                
-                # Keep only last 100 detections
-                if len(detection_history) > 100:
-                    detection_history.pop(0)
-    
-    return frame, current_detection
-
-def generate_frames():
-    camera = cv2.VideoCapture(0)
+                    model_status['error'] = str(e)
+                    raise
+                # Split the cores between the workers unless MODEL_THREADS says otherwise
+                threads = MODEL_THREADS or max(1, (os.cpu_count() or 1) // self.workers)
+                self.runners = [InferenceWorker(i, threads, model_path) for i in range(self.workers)]
+            else:
+                self.runners = [run_local_model]
+            for i, runner in enumerate(self.runners):
+                threading.Thread(target=self.run, args=(runner,), name=f'inference-scheduler-{i}', daemon=True).start()
+    
+    def wait_ready(self):
+        """Block until every worker process has loaded (or failed to load) its model"""
+        for runner in self.runners:
+            if isinstance(runner, InferenceWorker):
+                runner.ready.wait()
+    
+    def update_model_status(self):
+        workers = [runner for runner in self.runners if isinstance(runner, InferenceWorker)]
+        if not all(worker.ready.is_set() for worker in workers):
+            return
+        errors = [worker.error for worker in workers if worker.error]
+        model_status.update(
+            loaded=not errors,
+            warmed_up=not errors and MODEL_WARMUP,
+            load_seconds=max((worker.load_seconds or 0) for worker in workers),
+            warmup_seconds=max((worker.warmup_seconds or 0) for worker in workers),
+            error=errors[0] if errors else None
+        )
+    
+    def submit(self, frame):
+        """Queue a frame for inference and return a Future for its result"""
+        self.start()
+        future = concurrent.futures.Future()
+        with self.pending_condition:
+            self.pending.setdefault(frame.shape, collections.deque()).append((frame, future, time.perf_counter()))
+            self.pending_condition.notify()
+        return future
+    
+    def next_batch(self):
+        """Wait for the shape whose oldest frame has waited longest to fill a batch or reach its deadline"""
+        with self.pending_condition:
+            while True:
+                if not self.pending:
+                    self.pending_condition.wait()
+                    continue
+                shape, requests = min(self.pending.items(), key=lambda item: item[1][0][2])
+                remaining = requests[0][2] + self.max_wait - time.perf_counter()
+                if len(requests) < self.max_batch and remaining > 0:
+                    self.pending_condition.wait(remaining)
+                    continue
+                batch = [requests.popleft() for _ in range(min(self.max_batch, len(requests)))]
+                if not requests:
+                    del self.pending[shape]
+                return batch
+    
+    def run(self, runner):
+        if isinstance(runner, InferenceWorker):
+            runner.start()
+            with self.lock:
+                self.update_model_status()
+        
+        while True:
+            batch = self.next_batch()
+            started = time.perf_counter()
+            for frame, future, submitted in batch:
+                self.queue_latency.observe(started - submitted)
+            
+            try:
+                results = runner([frame for frame, future, submitted in batch])
+            except Exception as e:
+                for frame, future, submitted in batch:
+                    future.set_exception(e)
+                continue
+            
+            elapsed = time.perf_counter() - started
+            self.batch_sizes[len(batch)] += 1
+            for (frame, future, submitted), result in zip(batch, results):
+                self.inference_latency.observe(elapsed)
+                future.set_result(result)
+    
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'workers': self.workers,
+            'batches': sum(self.batch_sizes.values()),
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            'queue_latency': self.queue_latency.snapshot(),
+            'inference_latency': self.inference_latency.snapshot()
+        }
+
+inference_scheduler = InferenceScheduler()
+
+def run_model(source):
+    """Run the YOLO model on a frame or a list of frames, batched with other callers' frames"""
+    if isinstance(source, list):
+        futures = [inference_scheduler.submit(frame) for frame in source]
+        return [future.result() for future in futures]
+    return [inference_scheduler.submit(source).result()]
+
+def process_frame(frame, camera_id=None, tracker=None):
+    # Perform detection
+    results = run_model(frame)
+    return annotate_frame(frame, results, camera_id, tracker)
+
+def box_arrays(results):
+    """The boxes of all results as arrays: integer (x1, y1, x2, y2) corners, confidences and class indices"""
+    boxes = [r.boxes for r in results if len(r.boxes)]
+    if not boxes:
+        return np.empty((0, 4), dtype=np.int64), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    xyxy = np.concatenate([np.asarray(b.xyxy) for b in boxes]).astype(np.int64)
+    conf = np.concatenate([np.asarray(b.conf, dtype=np.float32) for b in boxes])
+    cls = np.concatenate([np.asarray(b.cls) for b in boxes]).astype(np.int64)
+    return xyxy, conf, cls
+
+def extract_detections(results):
+    """Get the (x1, y1, x2, y2, confidence, class index) of every box above the confidence threshold"""
+    xyxy, conf, cls = box_arrays(results)
+    
+    # Confidence is rounded up to 2 decimals before the threshold, as shown on the labels
+    conf = np.ceil(conf * np.float32(100)).astype(np.float64) / 100
+    keep = conf > 0.3
+    return list(zip(*xyxy[keep].T.tolist(), conf[keep].tolist(), cls[keep].tolist()))
+
+def draw_detections(frame, detections):
+    """Draw bounding boxes and labels for the extracted detections onto the frame"""
+    import cvzone
+    for x1, y1, x2, y2, conf, cls in detections:
+        w, h = x2 - x1, y2 - y1
+        cvzone.cornerRect(frame, (x1, y1, w, h), t=2)
+        cvzone.putTextRect(frame, f'{class_labels[cls]} {conf}', (x1, y1 - 10), scale=0.8, thickness=1, colorR=(255, 0, 0))
+    return frame
+
+def annotate_frame(frame, results, camera_id=None, tracker=None):
+    """Draw the YOLO results onto the frame and record any detections"""
+    detections = extract_detections(results)
+    draw_detections(frame, detections)
+    return frame, record_detections(frame, detections, camera_id, tracker)
+
+# Detection snapshots are written by a background thread so inference never waits on
+# the disk; the queue is bounded so a slow disk applies backpressure instead of using memory
+SNAPSHOT_QUEUE_SIZE = int(os.environ.get('SNAPSHOT_QUEUE_SIZE', 32))
+snapshot_queue = queue.Queue(maxsize=SNAPSHOT_QUEUE_SIZE)
+snapshot_counter = itertools.count()
+snapshot_writer_thread = None
+snapshot_writer_lock = threading.Lock()
+
+def snapshot_writer():
+    """Worker thread that writes queued detection snapshots to disk"""
     while True:
-        success, frame = camera.read()
-        if not success:
-            break
+        image_path, frame = snapshot_queue.get()
+        try:
+            if cv2.imwrite(image_path, frame):
+                image_index.add(image_path)
+            else:
+                print(f"ERROR: Could not save detection image to: {image_path}")
+        except Exception as e:
+            print(f"Error saving image: {e}")
+        finally:
+            if getattr(frame, 'ring', None) is not None:
+                frame.ring.release(frame.slot)
+            snapshot_queue.task_done()
+
+def save_snapshot(frame):
+    """Queue a copy of the frame to be written to the uploads folder and return its filename"""
+    global snapshot_writer_thread
+    with snapshot_writer_lock:
+        if snapshot_writer_thread is None:
+            snapshot_writer_thread = threading.Thread(target=snapshot_writer, name='snapshot-writer', daemon=True)
+            snapshot_writer_thread.start()
+    
+    # Millisecond timestamp plus a process-wide counter keeps every filename unique
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f")[:-3]
+    image_filename = f'detection_{timestamp}_{next(snapshot_counter):06d}.jpg'
+    
+    # A frame in a camera ring slot is kept alive by a reference instead of a copy
+    if getattr(frame, 'ring', None) is not None:
+        frame.ring.retain(frame.slot)
+    else:
+        frame = frame.copy()
+    snapshot_queue.put((os.path.join(UPLOAD_FOLDER, image_filename), frame))
+    return image_filename
+
+# Finish writing queued snapshots before the interpreter exits
+atexit.register(snapshot_queue.join)
+
+def box_iou(a, b):
+    """Intersection over union of two (x1, y1, x2, y2) boxes"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+class DetectionTracker:
+    """Matches boxes across frames by IoU, class and zone so each physical object becomes one event"""
+    
+    def __init__(self, iou_threshold=TRACK_IOU_THRESHOLD, timeout=TRACK_TIMEOUT):
+        self.iou_threshold = iou_threshold
+        self.timeout = timeout
+        self.tracks = []
+        self.lock = threading.Lock()
+    
+    def match(self, detections, zone_key, now):
+        """Pair each detection with an active track, or None if it starts a new object"""
+        with self.lock:
+            # Forget objects that have not been seen for a while
+            self.tracks = [track for track in self.tracks if now - track['last_seen'] <= self.timeout]
+            
+            # Greedily pair the most overlapping boxes first, one track per box
+            candidates = []
+            for i, (x1, y1, x2, y2, conf, cls) in enumerate(detections):
+                for track in self.tracks:
+                    if track['zone_key'] == zone_key and track['cls'] == cls:
+                        iou = box_iou((x1, y1, x2, y2), track['box'])
+                        if iou >= self.iou_threshold:
+                            candidates.append((iou, i, id(track), track))
+            candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+            
+            matches = [None] * len(detections)
+            used_tracks = set()
+            for iou, i, track_id, track in candidates:
+                if matches[i] is None and track_id not in used_tracks:
+                    matches[i] = track
+                    used_tracks.add(track_id)
+            
+            for i, (x1, y1, x2, y2, conf, cls) in enumerate(detections):
+                if matches[i] is None:
+                    matches[i] = {'zone_key': zone_key, 'cls': cls, 'event': None}
+                    self.tracks.append(matches[i])
+                matches[i]['box'] = (x1, y1, x2, y2)
+                matches[i]['last_seen'] = now
+            return matches
+
+detection_tracker = DetectionTracker()
+
+def record_detections(frame, detections, camera_id=None, tracker=None):
+    """Record the frame's detections as events.
+    
+    Frames from a camera reader pass their camera_id; uploads leave it out and are
+    attributed to the current camera, or to the user's location override.
+    
+    With a tracker, boxes of an object seen in earlier frames extend that object's
+    event instead of starting a new one: camera readers share detection_tracker and
+    each video job has its own. Without one, as for photo uploads, every box is a new event.
+    """
+    current_detection = None
+    if not detections:
+        return current_detection
+    
+    # Get zone information - use override if available
+    if camera_id is None and current_zone_override:
+        zone_info = current_zone_override
+    else:
+        zone_info = CAMERA_ZONES.get(camera_id or current_camera_id, {'zone_name': 'Unknown Zone', 'location': 'Unknown Location'})
+    camera_id = camera_id or current_camera_id
+    zone_key = (camera_id, zone_info['zone_name'], zone_info['location'])
+    
+    now = time.time()
+    seen_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if tracker is not None:
+        tracks = tracker.match(detections, zone_key, now)
+    else:
+        tracks = [{'event': None} for _ in detections]
+    
+    # Only frames that show a new object need a snapshot
+    image_filename = None
+    if any(track['event'] is None for track in tracks):
+        image_filename = save_snapshot(frame)
+    
+    for (x1, y1, x2, y2, conf, cls), track in zip(detections, tracks):
+        detection = track['event']
+        if detection is not None:
+            # Same object as before: extend the existing event
+            detection['last_seen'] = seen_at
+            detection['frames_seen'] += 1
+            detection['bbox'] = [x1, y1, x2 - x1, y2 - y1]
+            new_peak = conf > detection['peak_confidence']
+            if new_peak:
+                detection['peak_confidence'] = conf
+                detection['confidence'] = conf
+            
+            # Litter that stays in view must not change the version on every frame, or
+            # polling clients would never get a 304
+            if new_peak or now - track['versioned_at'] >= TRACK_VERSION_INTERVAL:
+                mark_detection_changed(detection)
+                track['versioned_at'] = now
+            current_detection = detection
+            continue
+        
+        detection = {
+            'timestamp': seen_at,
+            'class': class_labels[cls],
+            'confidence': conf,
+            'status': 'pending',  # pending, cleaned
+            'image_path': f'{UPLOAD_FOLDER}/{image_filename}',
+            'forCleaning': True,
+            'camera_id': camera_id,
+            'zone_name': zone_info['zone_name'],
+            'location': zone_info['location'],
+            'first_seen': seen_at,
+            'last_seen': seen_at,
+            'peak_confidence': conf,
+            'frames_seen': 1,
+            'bbox': [x1, y1, x2 - x1, y2 - y1]
+        }
+        
+        # Extract coordinates if present in the location format "Name (lat, lng)"
+        location_coords_match = re.search(r'\(([-+]?[0-9]*\.?[0-9]+),\s*([-+]?[0-9]*\.?[0-9]+)\)', zone_info['location'])
+        if location_coords_match:
+            detection['latitude'] = location_coords_match.group(1)
+            detection['longitude'] = location_coords_match.group(2)
+        
+        track['event'] = detection
+        track['versioned_at'] = now
+        current_detection = detection
+        
+        # Add to detection history
+        mark_detection_changed(detection)
+        detection_history.append(detection)
+        event_broker.publish('detection', detection)
+        print(f"Added detection to history: {detection}")
+        
+        # Keep only the last DETECTION_HISTORY_SIZE detections
+        if len(detection_history) > DETECTION_HISTORY_SIZE:
+            detection_history.pop(0)
+    
+    return current_detection
+
+# Seconds to wait before reopening a camera that failed to open or dropped out
+CAMERA_RECONNECT_DELAY = float(os.environ.get('CAMERA_RECONNECT_DELAY', 2.0))
+
+# Frames each camera reader keeps; older frames are overwritten rather than queued
+CAMERA_BUFFER_FRAMES = int(os.environ.get('CAMERA_BUFFER_FRAMES', 2))
+
+# Preallocated frame slots per camera: the buffered frames plus the ones being run through
+# the model, encoded or saved as snapshots. When all are in use new frames are dropped
+CAMERA_RING_SLOTS = int(os.environ.get('CAMERA_RING_SLOTS', CAMERA_BUFFER_FRAMES + 4))
+
+class SharedFrame(np.ndarray):
+    """A frame stored in a FrameRing slot.
+    
+    shared_location lets inference worker processes map the frame instead of receiving
+    a copy, and ring/slot let later stages take their own reference to it. Arrays
+    derived from it are ordinary frames.
+    """
+    
+    def __array_finalize__(self, obj):
+        self.shared_location = None
+        self.ring = None
+        self.slot = None
+
+class FrameRing:
+    """Preallocated frame slots in one shared memory block, handed between stages by index.
+    
+    Every slot is reference counted: the stage that fills it holds the first reference,
+    each stage it is passed to retains its own, and the slot is reused once all of
+    them have released it.
+    """
+    
+    def __init__(self, shape, slots=CAMERA_RING_SLOTS):
+        self.shape = tuple(shape)
+        slot_size = int(np.prod(self.shape))
+        self.block = shared_memory.SharedMemory(create=True, size=slot_size * slots)
+        self.frames = []
+        for slot in range(slots):
+            frame = np.ndarray.__new__(SharedFrame, self.shape, dtype=np.uint8,
+                                       buffer=self.block.buf, offset=slot * slot_size)
+            frame.shared_location = (self.block.name, slot * slot_size)
+            frame.ring = self
+            frame.slot = slot
+            self.frames.append(frame)
+        self.refcounts = [0] * slots
+        self.free = collections.deque(range(slots))
+        self.lock = threading.Lock()
+        atexit.register(self.block.unlink)
+    
+    def acquire(self):
+        """Take a free slot holding one reference, or None if every slot is in use"""
+        with self.lock:
+            if not self.free:
+                return None
+            slot = self.free.popleft()
+            self.refcounts[slot] = 1
+            return slot
+    
+    def retain(self, slot):
+        with self.lock:
+            self.refcounts[slot] += 1
+    
+    def release(self, slot):
+        with self.lock:
+            self.refcounts[slot] -= 1
+            if self.refcounts[slot] == 0:
+                self.free.append(slot)
+    
+    def close(self):
+        """Unlink and unmap a ring no longer filled; False while a slot or a view of one is still in use"""
+        with self.lock:
+            if any(self.refcounts):
+                return False
+            if self.frames:
+                # Unlinked only now, as inference workers map slots still in flight by name
+                self.frames = []
+                atexit.unregister(self.block.unlink)
+                self.block.unlink()
+                forget_shared_block(self.block.name)
+        try:
+            self.block.close()
+        except BufferError:
+            # A stage has released its slot but not yet dropped its view of it
+            return False
+        return True
+
+# Rings replaced after a camera changed resolution, closed once nothing uses them any more
+retired_rings = []
+retired_rings_lock = threading.Lock()
+
+def close_retired_rings():
+    with retired_rings_lock:
+        retired_rings[:] = [ring for ring in retired_rings if not ring.close()]
+
+def camera_source(camera_id):
+    """The cv2.VideoCapture source configured for a camera"""
+    source = CAMERA_ZONES.get(camera_id, {}).get('source')
+    if source is None:
+        # camera_N without a configured source is local device N
+        suffix = camera_id.rsplit('_', 1)[-1]
+        source = int(suffix) if suffix.isdigit() else 0
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return source
+
+class CameraReader:
+    """Long-lived thread that decodes one camera into a FrameRing and keeps only its latest frames"""
+    
+    def __init__(self, camera_id, source, on_frame):
+        self.camera_id = camera_id
+        self.source = source
+        self.on_frame = on_frame
+        self.ring = None
+        self.frames = collections.deque()
+        self.sequence = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name=f'camera-{camera_id}', daemon=True)
+    
+    def latest(self):
+        """(sequence, frame) of the newest frame with a reference the caller must release, or (0, None)"""
+        with self.lock:
+            if not self.frames:
+                return 0, None
+            sequence, frame = self.frames[-1]
+            frame.ring.retain(frame.slot)
+            return sequence, frame
+    
+    def read_frame(self, capture):
+        """Decode the next frame straight into a free ring slot; False at the end of the stream"""
+        if retired_rings:
+            close_retired_rings()
+        
+        slot = self.ring.acquire() if self.ring else None
+        if slot is None:
+            if self.ring is not None:
+                # Every slot is still in use downstream, so skip this frame
+                self.dropped += 1
+                return capture.grab()
+            success, frame = capture.read()
         else:
-            frame, detection = process_frame(frame)
+            success, frame = capture.read(self.ring.frames[slot])
+        if not success:
+            if slot is not None:
+                self.ring.release(slot)
+            return False
+        
+        if slot is None or frame is not self.ring.frames[slot]:
+            # First frame, or the stream changed resolution: size a new ring for it
+            if slot is not None:
+                self.ring.release(slot)
+                with retired_rings_lock:
+                    retired_rings.append(self.ring)
+            self.ring = FrameRing(frame.shape)
+            slot = self.ring.acquire()
+            self.ring.frames[slot][...] = frame
+        
+        with self.lock:
+            self.sequence += 1
+            self.frames.append((self.sequence, self.ring.frames[slot]))
+            if len(self.frames) > CAMERA_BUFFER_FRAMES:
+                sequence, old = self.frames.popleft()
+                old.ring.release(old.slot)
+        return True
+    
+    def run(self):
+        # Video files are played back at their own frame rate and looped;
+        # live sources are read as fast as they deliver
+        is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        while True:
+            capture = cv2.VideoCapture(self.source)
+            if not capture.isOpened():
+                print(f"Could not open camera {self.camera_id} ({self.source}), retrying")
+                capture.release()
+                time.sleep(CAMERA_RECONNECT_DELAY)
+                continue
+            
+            frame_interval = 1.0 / (capture.get(cv2.CAP_PROP_FPS) or 25) if is_file else 0
+            try:
+                while self.read_frame(capture):
+                    self.on_frame()
+                    if frame_interval:
+                        time.sleep(frame_interval)
+            finally:
+                capture.release()
             
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+            if not is_file:
+                print(f"Lost camera {self.camera_id} ({self.source}), reconnecting")
+                time.sleep(CAMERA_RECONNECT_DELAY)
+
+class FrameBroadcaster:
+    """Encodes each annotated frame of one camera once and hands the same JPEG to every viewer.
+    
+    Viewers only ever get the newest frame: one that is still sending when newer
+    frames arrive skips them (counted as dropped) instead of holding up the producer.
+    """
+    
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.payload = None
+        self.viewers = 0
+        self.frames_encoded = 0
+        self.frames_sent = 0
+        self.dropped = 0
+    
+    def publish(self, frame):
+        # Nobody is watching, so there is nothing to encode
+        if not self.viewers:
+            return
+        ret, buffer = cv2.imencode('.jpg', frame)
+        if not ret:
+            return
+        # join() copies the encoded buffer once, instead of tobytes() and then concatenation
+        payload = b''.join((b'--frame\r\nContent-Type: image/jpeg\r\n\r\n', buffer, b'\r\n'))
+        with self.condition:
+            self.sequence += 1
+            self.payload = payload
+            self.frames_encoded += 1
+            self.condition.notify_all()
+    
+    def stream(self):
+        """Yield multipart JPEG parts for one viewer until it disconnects"""
+        with self.condition:
+            self.viewers += 1
+            last_sequence = self.sequence
+        try:
+            while True:
+                with self.condition:
+                    while self.sequence == last_sequence:
+                        self.condition.wait()
+                    self.dropped += self.sequence - last_sequence - 1
+                    last_sequence, payload = self.sequence, self.payload
+                    self.frames_sent += 1
+                yield payload
+        finally:
+            with self.condition:
+                self.viewers -= 1
+    
+    def stats(self):
+        with self.condition:
+            return {
+                'viewers': self.viewers,
+                'frames_encoded': self.frames_encoded,
+                'frames_sent': self.frames_sent,
+                'dropped_frames': self.dropped
+            }
+
+class CaptureManager:
+    """One reader per camera and a single inference loop shared by every camera and viewer.
+    
+    The loop always takes each camera's newest frame and skips the ones it had no
+    time for, so inference cost depends on the number of cameras, not of viewers.
+    """
+    
+    def __init__(self):
+        self.readers = {}
+        self.broadcasters = {}
+        self.lock = threading.Lock()
+        self.new_frames = threading.Event()
+        self.inference_thread = None
+    
+    def start(self, camera_id):
+        """Start the camera's reader, and the shared inference loop, if they are not running yet"""
+        with self.lock:
+            if camera_id not in self.readers:
+                reader = CameraReader(camera_id, camera_source(camera_id), self.new_frames.set)
+                self.readers[camera_id] = reader
+                self.broadcasters[camera_id] = FrameBroadcaster()
+                reader.thread.start()
+            if self.inference_thread is None:
+                self.inference_thread = threading.Thread(target=self.run_inference, name='camera-inference', daemon=True)
+                self.inference_thread.start()
+    
+    def run_inference(self):
+        processed = {}
+        while True:
+            self.new_frames.wait()
+            self.new_frames.clear()
+            self.process_latest(processed)
+    
+    def process_latest(self, processed):
+        """Run the newest unprocessed frame of every camera through the model, annotation and encoding"""
+        with self.lock:
+            readers = list(self.readers.values())
+        batch = []
+        for reader in readers:
+            sequence, frame = reader.latest()
+            if frame is None:
+                continue
+            if processed.get(reader.camera_id) == sequence:
+                frame.ring.release(frame.slot)
+                continue
+            processed[reader.camera_id] = sequence
+            batch.append((reader.camera_id, frame))
+        if not batch:
+            return
+        
+        # One model call covers the newest frame of every camera. The frames stay in their
+        # ring slots throughout: boxes are drawn onto the slot once the model has read it
+        try:
+            results = run_model([frame for _, frame in batch])
+            for (camera_id, frame), result in zip(batch, results):
+                annotate_frame(frame, [result], camera_id, detection_tracker)
+                self.broadcasters[camera_id].publish(frame)
+        except Exception as e:
+            print(f"Error running camera inference: {e}")
+        finally:
+            for camera_id, frame in batch:
+                frame.ring.release(frame.slot)
+    
+    def stats(self):
+        with self.lock:
+            readers = dict(self.readers)
+            broadcasters = dict(self.broadcasters)
+        # ring_full_drops counts frames skipped because every ring slot was still in use
+        return {camera_id: dict(broadcaster.stats(), ring_full_drops=readers[camera_id].dropped)
+                for camera_id, broadcaster in broadcasters.items()}
+
+capture_manager = CaptureManager()
+
+def generate_frames(camera_id):
+    capture_manager.start(camera_id)
+    return capture_manager.broadcasters[camera_id].stream()
 
 @app.route('/')
 def index():
@@ -215,12 +1493,36 @@ def api_test():
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(),
+    return Response(generate_frames(current_camera_id),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/inference/stats')
+def inference_stats():
+    """Batch sizes and per-request queueing and inference latency histograms of the scheduler"""
+    return jsonify(inference_scheduler.stats())
+
+@app.route('/video_feed/stats')
+def video_feed_stats():
+    """Viewer, encoded and dropped frame counters of every running camera stream"""
+    return jsonify(capture_manager.stats())
+
+@app.route('/video_feed/<camera_id>')
+def camera_video_feed(camera_id):
+    if camera_id not in CAMERA_ZONES:
+        return jsonify({'error': 'Invalid camera ID'}), 404
+    return Response(generate_frames(camera_id),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/get_detections')
 def get_detections():
-    return jsonify(get_detections_from_db())
+    filters, limit, cursor = detection_query_from_request(request.args)
+    detections, next_cursor = get_detections_from_db(filters, limit, cursor)
+    
+    # This endpoint returns a bare list, so the next page cursor goes in a header
+    response = jsonify(detections)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/update_status', methods=['POST'])
 def update_status():
@@ -231,6 +1533,8 @@ def update_status():
     for detection in detection_history:
         if detection['timestamp'] == timestamp:
             detection['status'] = status
+            mark_detection_changed(detection)
+            event_broker.publish('status', detection)
             break
     
     return jsonify({'success': True})
@@ -263,6 +1567,7 @@ def process_photo():
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
+        image_index.add(filepath)
         
         # Read and process the image
         frame = cv2.imread(filepath)
@@ -295,6 +1600,188 @@ def process_photo():
             'detection': detection
         })
 
+def parse_video_stride(value):
+    """Parse a stride setting into a positive frame count or 'auto', or None if it is invalid"""
+    value = str(value).strip().lower()
+    if value == 'auto':
+        return 'auto'
+    try:
+        stride = int(value)
+    except ValueError:
+        return None
+    return stride if stride >= 1 else None
+
+def parse_video_batch_size(value):
+    """A video batch size clamped to 1..INFERENCE_MAX_BATCH.
+    
+    The scheduler splits larger batches into passes of INFERENCE_MAX_BATCH frames anyway,
+    so a larger one would only make the decoder buffer more frames.
+    """
+    return min(max(1, value), INFERENCE_MAX_BATCH)
+
+class FrameSampler:
+    """Decides which frames of a video need inference for a fixed or adaptive stride"""
+    
+    def __init__(self, stride):
+        self.stride = stride
+        self.frames_since_inference = None
+        self.reference = None
+    
+    def should_infer(self, frame):
+        if self.stride == 'auto':
+            signature = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 36),
+                                   interpolation=cv2.INTER_AREA).astype(np.int16)
+            infer = (self.reference is None
+                     or self.frames_since_inference + 1 >= VIDEO_MAX_STRIDE
+                     or np.abs(signature - self.reference).mean() > VIDEO_STRIDE_DIFF_THRESHOLD)
+            if infer:
+                self.reference = signature
+        else:
+            infer = self.frames_since_inference is None or self.frames_since_inference + 1 >= self.stride
+        
+        self.frames_since_inference = 0 if infer else self.frames_since_inference + 1
+        return infer
+
+def _put_until_stopped(q, item, stop):
+    """Put an item on a bounded queue, giving up once the pipeline has been stopped"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def process_video_file(filepath, processed_path, batch_size=VIDEO_BATCH_SIZE, progress=None, stride=1):
+    """Annotate every frame of a video file with a decode / infer / encode pipeline.
+    
+    A decoder thread reads batches of frames and a writer thread encodes the
+    annotated frames while the calling thread runs inference. The stages are
+    connected by bounded queues, and batches are written in the order they were read.
+    The batch size is capped at the scheduler's largest forward pass, which bounds
+    the frames held in the queues.
+    With a stride other than 1, frames skipped by the FrameSampler are drawn with
+    the boxes of the last inferred frame and are not recorded as new detections.
+    If given, progress(frames_done, frames_total) is called after every batch.
+    """
+    batch_size = min(max(1, batch_size), inference_scheduler.max_batch)
+    sampler = FrameSampler(stride)
+    
+    # Objects are tracked across this video's frames only, never merged into live camera events
+    tracker = DetectionTracker()
+    last_detections = []
+    cap = cv2.VideoCapture(filepath)
+    
+    # Get video properties
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    
+    # Create VideoWriter object
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(processed_path, fourcc, fps, (width, height))
+    
+    decoded_batches = queue.Queue(maxsize=VIDEO_QUEUE_SIZE)
+    annotated_batches = queue.Queue(maxsize=VIDEO_QUEUE_SIZE)
+    stop = threading.Event()
+    writer_errors = []
+    
+    def decode():
+        try:
+            batch = []
+            while cap.isOpened():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                batch.append(frame)
+                if len(batch) >= batch_size:
+                    if not _put_until_stopped(decoded_batches, batch, stop):
+                        return
+                    batch = []
+            
+            # Hand over whatever is left over at the end of the video
+            if batch:
+                _put_until_stopped(decoded_batches, batch, stop)
+        finally:
+            _put_until_stopped(decoded_batches, None, stop)
+    
+    def encode():
+        while True:
+            frames = annotated_batches.get()
+            if frames is None:
+                break
+            # Keep draining after a failure so inference never blocks on a full queue
+            if writer_errors:
+                continue
+            try:
+                for frame in frames:
+                    out.write(frame)
+            except Exception as e:
+                writer_errors.append(e)
+    
+    decoder = threading.Thread(target=decode, daemon=True)
+    writer = threading.Thread(target=encode, daemon=True)
+    decoder.start()
+    writer.start()
+    
+    frame_count = 0
+    if progress:
+        progress(0, frames_total)
+    try:
+        while True:
+            batch = decoded_batches.get()
+            if batch is None:
+                break
+            
+            # Run one model call over the frames of this batch that need inference
+            infer_flags = [sampler.should_infer(frame) for frame in batch]
+            inferred = [frame for frame, infer in zip(batch, infer_flags) if infer]
+            results = iter(run_model(inferred) if inferred else [])
+            
+            for frame, infer in zip(batch, infer_flags):
+                if infer:
+                    last_detections = extract_detections([next(results)])
+                    draw_detections(frame, last_detections)
+                    record_detections(frame, last_detections, tracker=tracker)
+                else:
+                    # Skipped frames reuse the last boxes without recording them again
+                    draw_detections(frame, last_detections)
+            
+            annotated_batches.put(batch)
+            frame_count += len(batch)
+            if progress:
+                progress(frame_count, max(frames_total, frame_count))
+    finally:
+        stop.set()
+        annotated_batches.put(None)
+        writer.join()
+        decoder.join()
+        
+        # Release resources
+        cap.release()
+        out.release()
+    
+    if writer_errors:
+        raise writer_errors[0]
+    
+    return frame_count
+
+def save_video_preview(filepath, filename):
+    """Save an annotated preview image of the first frame of a video"""
+    cap = cv2.VideoCapture(filepath)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        return None
+    
+    preview_filename = filename.rsplit('.', 1)[0] + '_preview.jpg'
+    preview_path = os.path.join(app.config['UPLOAD_FOLDER'], preview_filename)
+    frame = process_frame(frame)[0]
+    cv2.imwrite(preview_path, frame)
+    image_index.add(preview_path)
+    return preview_path
+
 @app.route('/process_video', methods=['POST'])
 def process_video():
     if 'video' not in request.files:
@@ -304,57 +1791,37 @@ def process_video():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
     
+    stride = parse_video_stride(request.form.get('stride', VIDEO_STRIDE))
+    if stride is None:
+        return jsonify({'error': "Stride must be a positive number of frames or 'auto'"}), 400
+    
+    # Large uploads can be processed in the background instead of holding the request open
+    if request.form.get('async', '').lower() in ('1', 'true', 'yes'):
+        return submit_video_job(file, stride)
+    
     if file:
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
+        image_index.add(filepath)
         
         # Create a processed video file with the same name in the processed folder
         processed_filename = 'processed_' + filename
         processed_path = os.path.join(app.config['PROCESSED_FOLDER'], processed_filename)
         
-        # Process the video
-        cap = cv2.VideoCapture(filepath)
-        
-        # Get video properties
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        
-        # Create VideoWriter object
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(processed_path, fourcc, fps, (width, height))
-        
-        # Process each frame
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Process the frame
-            frame, detection = process_frame(frame)
-            out.write(frame)
-        
-        # Release resources
-        cap.release()
-        out.release()
+        # Process the video, optionally with a custom inference batch size
+        batch_size = parse_video_batch_size(request.form.get('batch_size', VIDEO_BATCH_SIZE, type=int))
+        process_video_file(filepath, processed_path, batch_size, stride=stride)
         
         # Also save a preview image from the first frame
-        cap = cv2.VideoCapture(filepath)
-        ret, frame = cap.read()
-        if ret:
-            preview_filename = filename.rsplit('.', 1)[0] + '_preview.jpg'
-            preview_path = os.path.join(app.config['UPLOAD_FOLDER'], preview_filename)
-            frame = process_frame(frame)[0]
-            cv2.imwrite(preview_path, frame)
-            cap.release()
+        preview_path = save_video_preview(filepath, filename)
         
         return jsonify({
             'success': True,
             'original_path': filepath,
             'processed_path': processed_path,
             'processed_video': processed_filename,
-            'preview_path': preview_path if ret else None
+            'preview_path': preview_path
         })
 
 @app.route('/download_video/<filename>')
@@ -409,47 +1876,478 @@ def serve_processed_photo(filename):
         return send_file(processed_path)
     return jsonify({'error': 'File not found'}), 404
 
+def thumbnail_url(image_url):
+    """URL of the list-sized variant of a detection image"""
+    separator = '&' if '?' in image_url else '?'
+    return f"{image_url}{separator}w={THUMBNAIL_LIST_WIDTH}&q={THUMBNAIL_LIST_QUALITY}"
+
+def format_log(detection, host_url):
+    """Copy a detection_history entry with the fields the mobile app expects"""
+    # Create a copy to avoid modifying the original
+    detection_copy = detection.copy()
+    
+    # Add image_url if not present
+    if 'image_path' in detection_copy and 'image_url' not in detection_copy:
+        detection_copy['image_url'] = f"{host_url}/view_image/{detection_copy['image_path']}"
+    if 'image_url' in detection_copy and 'thumbnail_url' not in detection_copy:
+        detection_copy['thumbnail_url'] = thumbnail_url(detection_copy['image_url'])
+    
+    # Ensure forCleaning is set (default to true for compatibility)
+    if 'forCleaning' not in detection_copy:
+        detection_copy['forCleaning'] = True
+        
+    # Ensure all fields have sensible defaults
+    if 'zone_name' not in detection_copy:
+        detection_copy['zone_name'] = 'Unknown Zone'
+        
+    if 'location' not in detection_copy:
+        detection_copy['location'] = 'Unknown Location'
+        
+    if 'camera_id' not in detection_copy:
+        detection_copy['camera_id'] = 'camera_0'
+    
+    return detection_copy
+
+def logs_not_modified(etag):
+    """Return a 304 response if the client already has this version of the logs"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+    return None
+
 @app.route('/get_logs')
 def get_logs():
+    # Unchanged since the client's last poll: skip building the list entirely.
+    # The ETag is weak: image URLs depend on the host the client used, and last_seen and
+    # frames_seen of tracked objects are refreshed between version bumps.
+    version = history_version
+    etag = f'logs-{BOOT_ID}-{version}'
+    not_modified = logs_not_modified(etag)
+    if not_modified:
+        return not_modified
+    
     # Ensure each detection has the required fields for the mobile app
-    formatted_logs = []
-    for detection in detection_history:
-        # Create a copy to avoid modifying the original
-        detection_copy = detection.copy()
-        
-        # Add image_url if not present
-        if 'image_path' in detection_copy and 'image_url' not in detection_copy:
-            # Get host URL from request
-            host_url = request.host_url.rstrip('/')
-            image_filename = os.path.basename(detection_copy['image_path'])
-            detection_copy['image_url'] = f"{host_url}/view_image/{detection_copy['image_path']}"
-        
-        # Ensure forCleaning is set (default to true for compatibility)
-        if 'forCleaning' not in detection_copy:
-            detection_copy['forCleaning'] = True
-            
-        # Ensure all fields have sensible defaults
-        if 'zone_name' not in detection_copy:
-            detection_copy['zone_name'] = 'Unknown Zone'
-            
-        if 'location' not in detection_copy:
-            detection_copy['location'] = 'Unknown Location'
-            
-        if 'camera_id' not in detection_copy:
-            detection_copy['camera_id'] = 'camera_0'
-            
-        formatted_logs.append(detection_copy)
+    host_url = request.host_url.rstrip('/')
+    formatted_logs = [format_log(detection, host_url) for detection in detection_history]
     
-    print(f"Returning {len(formatted_logs)} logs")
-    # Debug print the first log if available
-    if formatted_logs:
-        print(f"First log: {formatted_logs[0]}")
-        
     # Add Access-Control-Allow-Origin header
     response = jsonify(formatted_logs)
+    response.set_etag(etag, weak=True)
+    response.headers['X-History-Version'] = str(version)
+    response.headers['X-Boot-Id'] = BOOT_ID
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/get_logs/changes')
+def get_log_changes():
+    """Detections created or changed since the version the client last saw.
+    
+    Clients pass back the boot_id of their last response as ?boot=. If the server has
+    restarted since, or the history was reset after that version, 'reset' is true and
+    'changes' holds the whole history, which should replace the client's copy.
+    'ids' lists the event_id of every detection still in the history, so clients can
+    drop the ones that have aged out of it.
+    """
+    since = request.args.get('since', 0, type=int)
+    boot = request.args.get('boot')
+    version = history_version
+    etag = f'changes-{BOOT_ID}-{boot}-{since}-{version}'
+    not_modified = logs_not_modified(etag)
+    if not_modified:
+        return not_modified
+    
+    if boot is not None:
+        reset = boot != BOOT_ID or since < history_reset_version
+    else:
+        # Clients that do not send their boot id: one ahead of the server synced before a restart
+        reset = since < history_reset_version or since > version
+    host_url = request.host_url.rstrip('/')
+    changes = [format_log(detection, host_url) for detection in detection_history
+               if reset or detection.get('version', 0) > since]
+    
+    response = jsonify({
+        'boot_id': BOOT_ID,
+        'version': version,
+        'reset': reset,
+        'changes': changes,
+        'ids': [detection['event_id'] for detection in detection_history]
+    })
+    response.set_etag(etag, weak=True)
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+# Seconds between keep-alive comments on idle event streams
+EVENT_KEEPALIVE_INTERVAL = 15
+
+def format_sse(event_type, data, event_id=None):
+    """Encode one Server-Sent Events message"""
+    message = f'event: {event_type}\n'
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    return message + f'data: {json.dumps(data)}\n\n'
+
+@app.route('/events')
+def events():
+    """Server-Sent Events stream of new detections and status changes.
+    
+    Optional zone and camera parameters filter the stream. Clients that pass
+    ?since=<version> (or reconnect with Last-Event-ID) first get the
+    detection_history changes they missed. A client that falls behind gets an
+    'overflow' event and should resync through /get_logs/changes. A bulk upload is
+    one 'bulk' event with its count, zones and cameras rather than one per detection.
+    """
+    zone = request.args.get('zone')
+    camera = request.args.get('camera')
+    since = request.args.get('since', type=int)
+    if since is None and request.headers.get('Last-Event-ID', '').isdigit():
+        since = int(request.headers['Last-Event-ID'])
+    host_url = request.host_url.rstrip('/')
+    
+    # Subscribe before replaying so nothing published in between is missed
+    subscription = event_broker.subscribe(zone, camera)
+    missed = []
+    if since is not None:
+        missed = [detection.copy() for detection in detection_history
+                  if detection.get('version', 0) > since and subscription.wants(detection)]
+    
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            for detection in missed:
+                yield format_sse('detection', format_log(detection, host_url), detection.get('version'))
+            
+            while True:
+                pending, dropped = subscription.wait(EVENT_KEEPALIVE_INTERVAL)
+                if dropped:
+                    yield format_sse('overflow', {'dropped': dropped, 'version': history_version})
+                for event in pending:
+                    # Bulk summaries carry counts rather than a detection
+                    data = event['detection'] if event['type'] == 'bulk' else format_log(event['detection'], host_url)
+                    yield format_sse(event['type'], data, event['id'])
+                if not pending and not dropped:
+                    yield ': keep-alive\n\n'
+        finally:
+            event_broker.unsubscribe(subscription)
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
     response.headers.add('Access-Control-Allow-Origin', '*')
     return response
 
+# Shipped placeholder served when an image cannot be found
+PLACEHOLDER_PATH = os.path.join('static', 'images', 'placeholder-image.jpg')
+
+# Placeholders naming the missing image (a timestamp or filename) kept rendered in memory
+PLACEHOLDER_CACHE_SIZE = int(os.environ.get('PLACEHOLDER_CACHE_SIZE', 256))
+
+@functools.lru_cache(maxsize=PLACEHOLDER_CACHE_SIZE)
+def render_placeholder(lines):
+    """(JPEG bytes, ETag) of a gray 300x300 placeholder showing (text, origin, scale, thickness) lines"""
+    placeholder = np.zeros((300, 300, 3), dtype=np.uint8)
+    placeholder[:] = (200, 200, 200)  # Gray background
+    for text, origin, scale, thickness in lines:
+        cv2.putText(placeholder, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness)
+    ret, buffer = cv2.imencode('.jpg', placeholder)
+    data = buffer.tobytes()
+    return data, hashlib.sha1(data).hexdigest()
+
+@functools.lru_cache(maxsize=1)
+def default_placeholder():
+    """(JPEG bytes, ETag) of the shipped placeholder, read once, or a rendered one if it is missing"""
+    try:
+        with open(PLACEHOLDER_PATH, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return render_placeholder((("No Image", (75, 150), 1, 2),))
+    return data, hashlib.sha1(data).hexdigest()
+
+def send_placeholder(placeholder=None):
+    """Serve a placeholder from memory, answering a matching If-None-Match with 304"""
+    data, etag = placeholder or default_placeholder()
+    response = Response(data, mimetype='image/jpeg')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def remove_generated_placeholders():
+    """Delete the per-request placeholder files earlier versions wrote to static/images"""
+    folder = os.path.dirname(PLACEHOLDER_PATH)
+    if not os.path.isdir(folder):
+        return
+    removed = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if (entry.name.startswith('placeholder-') and entry.name.endswith('.jpg')
+                    and entry.name != os.path.basename(PLACEHOLDER_PATH)):
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    print(f"Could not remove {entry.path}: {e}")
+    if removed:
+        print(f"Removed {removed} generated placeholder images from {folder}")
+
+# Image extensions the lookup endpoints fall back to when an exact path misses
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# A folder changed by another process is rescanned on a lookup miss at most this often
+IMAGE_INDEX_RESCAN_SECONDS = float(os.environ.get('IMAGE_INDEX_RESCAN_SECONDS', 60))
+
+def normalize_image_name(name):
+    """Lower case name without spaces or underscores, for lookups that ignore them"""
+    return name.replace(' ', '').replace('_', '').lower()
+
+class ImageIndex:
+    """In-memory index of the files in the image folders, so lookup misses do not scan directories.
+    
+    Each folder is scanned once, on its first lookup, into sorted lists of its names and
+    of their normalized forms: exact lookups are a set membership test and prefix lookups
+    a binary search. The code that writes images calls add(); files written by other
+    processes are picked up by a rescan when a lookup misses and the folder has changed.
+    """
+    
+    def __init__(self):
+        self.folders = {}
+        self.lock = threading.Lock()
+    
+    def scan(self, folder):
+        names = os.listdir(folder) if os.path.isdir(folder) else []
+        entry = {
+            'names': set(names),
+            'sorted': sorted(names),
+            'normalized': sorted((normalize_image_name(name), name) for name in names),
+            'mtime': os.stat(folder).st_mtime_ns if os.path.isdir(folder) else None,
+            'scanned_at': time.time()
+        }
+        self.folders[folder] = entry
+        return entry
+    
+    def folder(self, folder, refresh=False):
+        """The folder's index, scanning it on first use, or on a miss once it changed on disk"""
+        with self.lock:
+            entry = self.folders.get(folder)
+            if entry is None:
+                return self.scan(folder)
+            if refresh and time.time() - entry['scanned_at'] >= IMAGE_INDEX_RESCAN_SECONDS:
+                mtime = os.stat(folder).st_mtime_ns if os.path.isdir(folder) else None
+                if mtime != entry['mtime']:
+                    return self.scan(folder)
+                entry['scanned_at'] = time.time()
+            return entry
+    
+    def add(self, path):
+        """Record a file just written to an indexed folder"""
+        folder, name = os.path.split(path)
+        with self.lock:
+            entry = self.folders.get(folder)
+            if entry is None or name in entry['names']:
+                return
+            entry['names'].add(name)
+            bisect.insort(entry['sorted'], name)
+            bisect.insort(entry['normalized'], (normalize_image_name(name), name))
+    
+    def discard(self, folder, name):
+        with self.lock:
+            entry = self.folders.get(folder)
+            if entry is None or name not in entry['names']:
+                return
+            entry['names'].discard(name)
+            del entry['sorted'][bisect.bisect_left(entry['sorted'], name)]
+            del entry['normalized'][bisect.bisect_left(entry['normalized'], (normalize_image_name(name), name))]
+    
+    def lookup(self, folder, match):
+        """Path of the first indexed file match() picks that still exists, rescanning once on a miss"""
+        for refresh in (False, True):
+            entry = self.folder(folder, refresh)
+            with self.lock:
+                name = match(entry)
+            while name is not None:
+                path = os.path.join(folder, name)
+                if os.path.isfile(path):
+                    return path
+                # Deleted behind our back: forget it and look again
+                self.discard(folder, name)
+                with self.lock:
+                    name = match(entry)
+        return None
+    
+    def find(self, folder, name):
+        """Path of the file with exactly this name, or None"""
+        return self.lookup(folder, lambda entry: name if name in entry['names'] else None)
+    
+    def find_prefix(self, folder, prefix, extensions=IMAGE_EXTENSIONS):
+        """Path of the first file, in name order, starting with prefix and ending in one of extensions"""
+        def match(entry):
+            names = entry['sorted']
+            for i in range(bisect.bisect_left(names, prefix), len(names)):
+                if not names[i].startswith(prefix):
+                    return None
+                if extensions is None or names[i].lower().endswith(extensions):
+                    return names[i]
+            return None
+        return self.lookup(folder, match)
+    
+    def find_normalized(self, folder, name):
+        """Path of the first file whose normalized name starts with the normalized name, any extension"""
+        key = normalize_image_name(name)
+        def match(entry):
+            names = entry['normalized']
+            i = bisect.bisect_left(names, (key, ''))
+            if i < len(names) and names[i][0].startswith(key):
+                return names[i][1]
+            return None
+        return self.lookup(folder, match)
+
+image_index = ImageIndex()
+
+# Resized variants of detection images (?w=320&q=70) are created on first request and kept
+# in a size-bounded disk cache, so list views do not download full resolution snapshots
+THUMBNAIL_FOLDER = os.environ.get('THUMBNAIL_FOLDER', 'thumbnails')
+THUMBNAIL_CACHE_MB = float(os.environ.get('THUMBNAIL_CACHE_MB', 256))
+THUMBNAIL_MAX_WIDTH = 1920
+THUMBNAIL_DEFAULT_QUALITY = 80
+
+# A variant never changes once created, so clients may keep it for a year
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+
+# Variant linked from detection listings as thumbnail_url
+THUMBNAIL_LIST_WIDTH = int(os.environ.get('THUMBNAIL_LIST_WIDTH', 480))
+THUMBNAIL_LIST_QUALITY = int(os.environ.get('THUMBNAIL_LIST_QUALITY', 70))
+
+class ThumbnailCache:
+    """Resized JPEG variants of images on disk, evicting the least recently used past max_bytes.
+    
+    A variant is named by a hash of the source path, size and modification time and the
+    requested width and quality, so a replaced source gets new variants and the name
+    doubles as a strong ETag.
+    """
+    
+    def __init__(self, folder, max_bytes):
+        # Absolute, as send_file resolves relative paths against the app's root, not the working directory
+        self.folder = os.path.abspath(folder)
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        
+        # Pick up the variants of earlier runs, least recently read first
+        os.makedirs(self.folder, exist_ok=True)
+        existing = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.endswith('.tmp'):
+                os.remove(path)
+            elif name.endswith('.jpg'):
+                stat = os.stat(path)
+                existing.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(existing):
+            self.entries[name] = size
+            self.total_bytes += size
+        self.evict()
+    
+    def variant(self, source_path, width, quality):
+        """(path, etag) of the source image scaled down to at most width pixels wide, creating it if needed"""
+        stat = os.stat(source_path)
+        key = f'{os.path.realpath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}|{width}|{quality}'
+        etag = hashlib.sha1(key.encode()).hexdigest()
+        name = f'{etag}.jpg'
+        path = os.path.join(self.folder, name)
+        with self.lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+                self.hits += 1
+                return path, etag
+            self.misses += 1
+        
+        image = cv2.imread(source_path)
+        if image is None:
+            raise ValueError(f'Not a readable image: {source_path}')
+        height, source_width = image.shape[:2]
+        if width < source_width:
+            size = (width, max(1, round(height * width / source_width)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        
+        # Write under a temporary name so a concurrent request never sends a partial file
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(buffer)
+        os.replace(temp_path, path)
+        with self.lock:
+            if name not in self.entries:
+                self.entries[name] = buffer.nbytes
+                self.total_bytes += buffer.nbytes
+            self.entries.move_to_end(name)
+            self.evict()
+        return path, etag
+    
+    def evict(self):
+        # Always keep the newest variant, even if it alone exceeds the limit
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            name, size = self.entries.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            self.evictions += 1
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'variants': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+# Only the server process serves images. Worker and export processes must not sweep
+# temporary files or evict variants the server is writing
+thumbnail_cache = None
+if SERVER_PROCESS:
+    thumbnail_cache = ThumbnailCache(THUMBNAIL_FOLDER, int(THUMBNAIL_CACHE_MB * 1024 * 1024))
+
+def image_variant_args():
+    """(width, quality) asked for with ?w= and ?q=, or None when the request wants the original"""
+    if 'w' not in request.args and 'q' not in request.args:
+        return None
+    width = request.args.get('w', THUMBNAIL_MAX_WIDTH, type=int)
+    quality = request.args.get('q', THUMBNAIL_DEFAULT_QUALITY, type=int)
+    return min(max(width, 16), THUMBNAIL_MAX_WIDTH), min(max(quality, 10), 95)
+
+def image_variant_path(filepath):
+    """Path of the requested variant of the image, or the image itself when none was asked for or it cannot be resized"""
+    variant = image_variant_args()
+    if variant is None:
+        return filepath, None
+    try:
+        return thumbnail_cache.variant(filepath, *variant)
+    except (ValueError, OSError) as e:
+        # e.g. a video in the uploads folder: send it unchanged
+        print(f"Could not create image variant of {filepath}: {e}")
+        return filepath, None
+
+def send_image(filepath, mimetype=None):
+    """send_file for detection images, sending a cached resized variant if ?w= or ?q= is given"""
+    path, etag = image_variant_path(filepath)
+    if etag is None:
+        return send_file(filepath, mimetype=mimetype)
+    response = send_file(path, mimetype='image/jpeg', etag=etag, max_age=THUMBNAIL_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/thumbnails/stats')
+def thumbnail_stats():
+    """Size and hit rate of the resized image variant cache"""
+    return jsonify(thumbnail_cache.stats())
+
 @app.route('/uploads/<path:filename>')
 def serve_upload(filename):
     # Determine the appropriate MIME type
@@ -466,7 +2364,7 @@ def serve_upload(filename):
     file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
     mimetype = mime_types.get(file_ext, 'application/octet-stream')
     
-    return send_file(os.path.join(UPLOAD_FOLDER, filename), mimetype=mimetype)
+    return send_image(os.path.join(UPLOAD_FOLDER, filename), mimetype=mimetype)
 
 @app.route('/view_image/<path:filename>')
 def view_image(filename):
@@ -485,59 +2383,43 @@ def view_image(filename):
     
     print(f"DEBUG: Checking {len(possible_paths)} possible file paths:")
     
+    # Default to image/jpeg, but try to set a more appropriate MIME type if possible
+    mime_types = {
+        'jpg': 'image/jpeg',
+        'jpeg': 'image/jpeg',
+        'png': 'image/png',
+        'gif': 'image/gif'
+    }
+    
     # Find the first path that exists and is a file
     for idx, filepath in enumerate(possible_paths):
         print(f"DEBUG: Path {idx}: {filepath} - {'EXISTS' if os.path.exists(filepath) else 'NOT FOUND'}")
         if os.path.exists(filepath) and os.path.isfile(filepath):
             print(f"DEBUG: Found image at: {filepath}")
             
-            # Default to image/jpeg, but try to set a more appropriate MIME type if possible
-            mime_types = {
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg',
-                'png': 'image/png',
-                'gif': 'image/gif'
-            }
-            
             # Get file extension
             file_ext = filepath.rsplit('.', 1)[1].lower() if '.' in filepath else 'jpg'
             mimetype = mime_types.get(file_ext, 'image/jpeg')
             
-            return send_file(filepath, mimetype=mimetype)
+            return send_image(filepath, mimetype=mimetype)
     
     # If we've checked all paths and found nothing, look for any image file with a similar name
     image_basename = os.path.basename(filename)
     name_part = os.path.splitext(image_basename)[0]  # Get the name without extension
     
-    print(f"DEBUG: Looking for any file containing the name part: {name_part}")
+    print(f"DEBUG: Looking for any file starting with the name part: {name_part}")
     
     for folder in [UPLOAD_FOLDER, DETECTION_FOLDER]:
-        if os.path.exists(folder):
-            for file in os.listdir(folder):
-                if name_part in file and file.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                    filepath = os.path.join(folder, file)
-                    print(f"DEBUG: Found similar image: {filepath}")
-                    file_ext = filepath.rsplit('.', 1)[1].lower()
-                    mimetype = mime_types.get(file_ext, 'image/jpeg')
-                    return send_file(filepath, mimetype=mimetype)
+        filepath = image_index.find_prefix(folder, name_part)
+        if filepath:
+            print(f"DEBUG: Found similar image: {filepath}")
+            file_ext = filepath.rsplit('.', 1)[1].lower()
+            mimetype = mime_types.get(file_ext, 'image/jpeg')
+            return send_image(filepath, mimetype=mimetype)
     
     # If still no image found, serve a placeholder image instead of 404
     print(f"DEBUG: Image not found in any location, serving placeholder instead")
-    placeholder_path = os.path.join('static', 'images', 'placeholder-image.jpg')
-    
-    # Ensure placeholder exists
-    if not os.path.exists(placeholder_path):
-        # Create a basic placeholder image
-        placeholder_dir = os.path.join('static', 'images')
-        os.makedirs(placeholder_dir, exist_ok=True)
-        
-        placeholder = np.zeros((300, 300, 3), dtype=np.uint8)
-        placeholder[:] = (200, 200, 200)  # Gray background
-        cv2.putText(placeholder, "No Image", (75, 150), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
-        cv2.imwrite(placeholder_path, placeholder)
-        
-    return send_file(placeholder_path, mimetype='image/jpeg')
+    return send_placeholder()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -557,36 +2439,30 @@ def detect():
     height, width = img.shape[:2]
     
     # Perform object detection
-    results = yolo_model(img)
+    results = run_model(img)
     
+    import cvzone
     garbage_found = False
     detection_results = []
     
     # Process detection results
-    for r in results:
-        boxes = r.boxes
-        for box in boxes:
-            x1, y1, x2, y2 = box.xyxy[0]
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-            
-            w, h = x2 - x1, y2 - y1
-            
-            conf = float(box.conf[0])
-            cls = int(box.cls[0])
-            
-            if conf > 0.3:
-                garbage_found = True
-                
-                # Draw bounding box on the image
-                cvzone.cornerRect(img, (x1, y1, w, h), t=2)
-                cvzone.putTextRect(img, f'{class_labels[cls]} {conf:.2f}', (x1, y1 - 10), scale=0.8, thickness=1, colorR=(255, 0, 0))
-                
-                # Add detection result
-                detection_results.append({
-                    'class': class_labels[cls],
-                    'confidence': float(conf),
-                    'bbox': [int(x1), int(y1), int(w), int(h)]
-                })
+    xyxy, conf, cls = box_arrays(results)
+    conf = conf.astype(np.float64)
+    keep = conf > 0.3
+    for (x1, y1, x2, y2), conf, cls in zip(xyxy[keep].tolist(), conf[keep].tolist(), cls[keep].tolist()):
+        garbage_found = True
+        w, h = x2 - x1, y2 - y1
+        
+        # Draw bounding box on the image
+        cvzone.cornerRect(img, (x1, y1, w, h), t=2)
+        cvzone.putTextRect(img, f'{class_labels[cls]} {conf:.2f}', (x1, y1 - 10), scale=0.8, thickness=1, colorR=(255, 0, 0))
+        
+        # Add detection result
+        detection_results.append({
+            'class': class_labels[cls],
+            'confidence': conf,
+            'bbox': [x1, y1, w, h]
+        })
     
     # If garbage is detected, save the image and detection metadata
     if garbage_found:
@@ -594,6 +2470,7 @@ def detect():
         image_filename = f"{timestamp}.jpg"
         image_path = os.path.join(DETECTION_FOLDER, image_filename)
         cv2.imwrite(image_path, img)
+        image_index.add(image_path)
         
         # Create detection entry
         detection_entry = {
@@ -622,7 +2499,7 @@ def detect_video():
 def get_detection_image(timestamp):
     image_path = os.path.join(DETECTION_FOLDER, f"{timestamp}.jpg")
     if os.path.exists(image_path):
-        return send_file(image_path, mimetype='image/jpeg')
+        return send_image(image_path, mimetype='image/jpeg')
     return jsonify({'error': 'Image not found'}), 404
 
 @app.route('/webcam_detect', methods=['POST'])
@@ -673,15 +2550,14 @@ def upload_report():
 @app.route('/mobile/get_detections')
 def mobile_get_detections():
     """API endpoint for mobile app to fetch detection history."""
-    # Get detections from database
-    all_detections = get_detections_from_db()
-    
-    # Only return detections marked for cleaning
-    cleaning_detections = [d for d in all_detections if d.get('for_cleaning', 1) == 1]
+    # Only return detections marked for cleaning unless the client asks otherwise
+    filters, limit, cursor = detection_query_from_request(request.args, for_cleaning=1)
+    detections, next_cursor = get_detections_from_db(filters, limit, cursor)
     
     return jsonify({
         'success': True,
-        'detections': cleaning_detections
+        'detections': detections,
+        'next_cursor': next_cursor
     })
 
 @app.route('/mobile/update_status', methods=['POST'])
@@ -744,6 +2620,8 @@ def mobile_report_cleaned():
             detection['cleaned_by'] = cleaned_by
             detection['cleaned_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             detection['notes'] = notes
+            mark_detection_changed(detection)
+            event_broker.publish('status', detection)
             updated = True
             break
     
@@ -764,18 +2642,17 @@ def api_check():
 def create_test_detection():
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     
-    # Look for existing images in uploads folder
-    upload_files = os.listdir(UPLOAD_FOLDER)
-    image_files = [f for f in upload_files if f.endswith(('.jpg', '.jpeg', '.png'))]
+    # Look for an existing image in uploads folder
+    first_image = image_index.find_prefix(UPLOAD_FOLDER, '', ('.jpg', '.jpeg', '.png'))
     
-    if not image_files:
+    if not first_image:
         return jsonify({
             'status': 'error',
             'message': 'No image files found in uploads folder'
         }), 400
     
     # Use the first image found
-    image_path = f"{UPLOAD_FOLDER}/{image_files[0]}"
+    image_path = f"{UPLOAD_FOLDER}/{os.path.basename(first_image)}"
     
     # Create a basic detection entry
     detection = {
@@ -791,6 +2668,7 @@ def create_test_detection():
     }
     
     # Add to detection history
+    mark_detection_changed(detection)
     detection_history.append(detection)
     
     print(f"Created test detection with image: {image_path}")
@@ -855,6 +2733,7 @@ def populate_test_data():
     # Clear existing detection history
     global detection_history
     detection_history = []
+    mark_history_reset()
     
     # Find image files in uploads
     upload_files = os.listdir(UPLOAD_FOLDER)
@@ -883,6 +2762,7 @@ def populate_test_data():
             'location': f'Test Location {i+1}'
         }
         
+        mark_detection_changed(detection)
         detection_history.append(detection)
     
     print(f"Populated {len(detection_history)} test detections")
@@ -894,6 +2774,20 @@ def populate_test_data():
         'detections': detection_history
     })
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 while it is loading or if it failed"""
+    status = {
+        'ready': model_status['loaded'] and (model_status['warmed_up'] or not MODEL_WARMUP),
+        'backend': INFERENCE_BACKEND,
+        'fixed_input': MODEL_FIXED_INPUT,
+        'loading': bool(model_warmup_thread and model_warmup_thread.is_alive()),
+        'load_seconds': model_status['load_seconds'],
+        'warmup_seconds': model_status['warmup_seconds'],
+        'error': model_status['error']
+    }
+    return jsonify(status), 200 if status['ready'] else 503
+
 @app.route('/ping')
 def ping_test():
     """Simple page to test if server is accessible from mobile devices"""
@@ -936,6 +2830,7 @@ def restart():
     """Restart the detection history and reset state"""
     global detection_history
     detection_history = []
+    mark_history_reset()
     
     # Add a sample detection
     detection = {
@@ -950,15 +2845,15 @@ def restart():
     }
     
     # Find an image to use
-    upload_files = os.listdir(UPLOAD_FOLDER)
-    image_files = [f for f in upload_files if f.endswith(('.jpg', '.jpeg', '.png'))]
+    first_image = image_index.find_prefix(UPLOAD_FOLDER, '', ('.jpg', '.jpeg', '.png'))
     
-    if image_files:
-        detection['image_path'] = f"{UPLOAD_FOLDER}/{image_files[0]}"
+    if first_image:
+        detection['image_path'] = f"{UPLOAD_FOLDER}/{os.path.basename(first_image)}"
     else:
         detection['image_path'] = "uploads/placeholder.jpg"
     
     # Add to detection history
+    mark_detection_changed(detection)
     detection_history.append(detection)
     
     # Ensure defaults directory exists
@@ -966,11 +2861,11 @@ def restart():
         os.makedirs('static/images')
     
     # Create a placeholder image if needed
-    placeholder_path = 'static/images/placeholder-image.jpg'
+    placeholder_path = PLACEHOLDER_PATH
     if not os.path.exists(placeholder_path):
         # If no placeholder exists, copy an existing image or create a basic one
-        if image_files:
-            source_img = cv2.imread(os.path.join(UPLOAD_FOLDER, image_files[0]))
+        if first_image:
+            source_img = cv2.imread(first_image)
             cv2.imwrite(placeholder_path, source_img)
         else:
             # Create a basic placeholder image
@@ -978,6 +2873,7 @@ def restart():
             placeholder[:] = (200, 200, 200)  # Gray background
             cv2.putText(placeholder, "Placeholder", (75, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
             cv2.imwrite(placeholder_path, placeholder)
+        default_placeholder.cache_clear()
     
     return jsonify({
         'success': True,
@@ -986,14 +2882,27 @@ def restart():
         'placeholder_created': os.path.exists(placeholder_path)
     })
 
+def ensure_column(cursor, table, column, definition):
+    """Add a column to a table that was created by an older version of the schema"""
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+# SQLite database file and the number of connections kept open for reuse
+DB_PATH = os.environ.get('DB_PATH', 'detections.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 16))
+
 # Initialize SQLite database
 def init_db():
     """Initialize the SQLite database and create tables if they don't exist"""
     conn = None
     try:
-        conn = sqlite3.connect('detections.db')
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
+        # Write-ahead logging lets readers keep going while a detection is being written
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Create detections table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS detections (
@@ -1013,6 +2922,36 @@ def init_db():
         )
         ''')
         
+        # Create background video processing jobs table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS video_jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT DEFAULT 'queued',
+            filename TEXT,
+            original_path TEXT,
+            processed_path TEXT,
+            preview_path TEXT,
+            batch_size INTEGER,
+            stride TEXT DEFAULT '1',
+            frames_done INTEGER DEFAULT 0,
+            frames_total INTEGER DEFAULT 0,
+            error TEXT,
+            created_at TEXT,
+            started_at TEXT,
+            finished_at TEXT
+        )
+        ''')
+        
+        # Columns added after the tables were first created
+        ensure_column(cursor, 'video_jobs', 'stride', "TEXT DEFAULT '1'")
+        
+        # Indexes for the filtered, newest-first detection listings
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_detections_status ON detections (status, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_detections_zone ON detections (zone_name, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_detections_camera ON detections (camera_id, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_detections_class ON detections (class, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_detections_cleaning ON detections (for_cleaning, timestamp)')
+        
         conn.commit()
         return True
     except Error as e:
@@ -1022,70 +2961,194 @@ def init_db():
         if conn:
             conn.close()
 
-# Initialize database on startup
-init_db()
+# Initialize database on startup (not in worker or export processes, which only run the model)
+if SERVER_PROCESS:
+    init_db()
+
+class ConnectionPool:
+    """Thread-safe pool of long-lived SQLite connections.
+    
+    Connections are opened lazily up to the pool size and handed out one thread at
+    a time. When the pool is exhausted, released connections go straight to the
+    longest waiting thread so a busy reader can't starve the writer. Because
+    connections stay open, sqlite3's per-connection statement cache keeps the
+    queries below prepared instead of compiling them on every call.
+    """
+    
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.idle = []
+        self.waiters = collections.deque()
+        self.opened = 0
+        self.lock = threading.Lock()
+    
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row  # This enables column access by name
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL, and avoids an fsync per commit
+        conn.execute('PRAGMA busy_timeout=10000')
+        conn.execute('PRAGMA cache_size=-16000')  # 16 MB page cache per connection
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    def acquire(self):
+        """Take an idle connection, opening a new one or waiting in line if there is none"""
+        with self.lock:
+            if self.idle and not self.waiters:
+                return self.idle.pop()
+            can_open = self.opened < self.size
+            if can_open:
+                self.opened += 1
+            else:
+                waiter = [threading.Event(), None]
+                self.waiters.append(waiter)
+        
+        if not can_open:
+            waiter[0].wait()
+            return waiter[1]
+        
+        try:
+            return self.connect()
+        except Error:
+            with self.lock:
+                self.opened -= 1
+            raise
+    
+    def release(self, conn):
+        """Return a connection to the pool, discarding any uncommitted changes"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self.lock:
+            if self.waiters:
+                waiter = self.waiters.popleft()
+                waiter[1] = conn
+                waiter[0].set()
+            else:
+                self.idle.append(conn)
+
+db_pool = ConnectionPool(DB_PATH, DB_POOL_SIZE)
 
 # Helper functions for database operations
 def get_db_connection():
-    """Get a connection to the SQLite database"""
-    conn = sqlite3.connect('detections.db')
-    conn.row_factory = sqlite3.Row  # This enables column access by name
-    return conn
+    """Get a pooled connection to the SQLite database; hand it back with release_db_connection"""
+    return db_pool.acquire()
+
+def release_db_connection(conn):
+    """Return a connection from get_db_connection to the pool"""
+    db_pool.release(conn)
+
+INSERT_DETECTION_SQL = '''
+INSERT OR REPLACE INTO detections (
+    timestamp, class, confidence, status, image_path, 
+    for_cleaning, camera_id, zone_name, location, created_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def detection_row(detection_data, created_at):
+    """INSERT_DETECTION_SQL parameters for a detection dict, with the defaults for missing fields"""
+    return (
+        detection_data.get('timestamp', datetime.now().isoformat()),
+        detection_data.get('class', 'unknown'),
+        detection_data.get('confidence', 0.0),
+        detection_data.get('status', 'pending'),
+        detection_data.get('image_path', ''),
+        detection_data.get('forCleaning', 1),
+        detection_data.get('camera_id', 'unknown'),
+        detection_data.get('zone_name', 'Unknown Zone'),
+        detection_data.get('location', 'Unknown Location'),
+        created_at
+    )
 
 def save_detection_to_db(detection_data):
     """Save a detection to the database"""
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute('''
-        INSERT OR REPLACE INTO detections (
-            timestamp, class, confidence, status, image_path, 
-            for_cleaning, camera_id, zone_name, location, created_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            detection_data.get('timestamp', datetime.now().isoformat()),
-            detection_data.get('class', 'unknown'),
-            detection_data.get('confidence', 0.0),
-            detection_data.get('status', 'pending'),
-            detection_data.get('image_path', ''),
-            detection_data.get('forCleaning', 1),
-            detection_data.get('camera_id', 'unknown'),
-            detection_data.get('zone_name', 'Unknown Zone'),
-            detection_data.get('location', 'Unknown Location'),
-            datetime.now().isoformat()
-        ))
+        cursor.execute(INSERT_DETECTION_SQL, detection_row(detection_data, datetime.now().isoformat()))
         conn.commit()
         return True
     except Error as e:
         print(f"Error saving detection to database: {e}")
         return False
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+# Page size for detection listings, and the largest page a client may ask for
+DETECTIONS_PAGE_SIZE = int(os.environ.get('DETECTIONS_PAGE_SIZE', 100))
+DETECTIONS_MAX_PAGE_SIZE = int(os.environ.get('DETECTIONS_MAX_PAGE_SIZE', 1000))
+
+# Query parameter -> SQL condition for server-side detection filters
+DETECTION_FILTERS = {
+    'status': 'status = ?',
+    'zone': 'zone_name = ?',
+    'camera': 'camera_id = ?',
+    'class': 'class = ?',
+    'for_cleaning': 'for_cleaning = ?',
+    'since': 'timestamp >= ?',
+    'until': 'timestamp <= ?',
+}
 
-def get_detections_from_db():
-    """Get all detections from the database"""
+def detection_query_from_request(args, **defaults):
+    """Read detection filters, page size and cursor from request arguments"""
+    filters = dict(defaults)
+    for name in DETECTION_FILTERS:
+        value = args.get(name)
+        if value is None or value == '':
+            continue
+        if name == 'for_cleaning':
+            value = 1 if value.lower() in ('1', 'true', 'yes') else 0
+        filters[name] = value
+    
+    limit = args.get('limit', DETECTIONS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, DETECTIONS_MAX_PAGE_SIZE))
+    return filters, limit, args.get('cursor') or None
+
+def get_detections_from_db(filters=None, limit=DETECTIONS_PAGE_SIZE, cursor=None):
+    """Get one page of detections, newest first, and the cursor for the next page.
+    
+    Pagination is keyset based: the cursor is the timestamp of the last detection
+    returned, so every page is an index range scan no matter how deep it is.
+    """
+    conditions = []
+    params = []
+    for name, value in (filters or {}).items():
+        conditions.append(DETECTION_FILTERS[name])
+        params.append(value)
+    if cursor:
+        conditions.append('timestamp < ?')
+        params.append(cursor)
+    
+    query = 'SELECT * FROM detections'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY timestamp DESC LIMIT ?'
+    # Fetch one extra row to find out whether there is another page
+    params.append(limit + 1)
+    
     conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM detections ORDER BY timestamp DESC')
-        rows = cursor.fetchall()
+        rows = conn.execute(query, params).fetchall()
         
         # Convert rows to dictionaries
+        host_url = request.host_url.rstrip('/')
         detections = []
-        for row in rows:
+        for row in rows[:limit]:
             detection = dict(row)
-            # Add image_url for Flutter app
+            # Add image_url for Flutter app, and a list-sized thumbnail_url
             if detection['image_path']:
-                host_url = request.host_url.rstrip('/')
                 detection['image_url'] = f"{host_url}/view_image/{detection['image_path']}"
+                detection['thumbnail_url'] = thumbnail_url(detection['image_url'])
             detections.append(detection)
         
-        return detections
+        next_cursor = detections[-1]['timestamp'] if len(rows) > limit else None
+        return detections, next_cursor
     except Error as e:
         print(f"Error retrieving detections from database: {e}")
-        return []
+        return [], None
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def update_detection_status(timestamp, status, cleaned_by=None, notes=None):
     """Update the status of a detection"""
@@ -1106,21 +3169,242 @@ def update_detection_status(timestamp, status, cleaned_by=None, notes=None):
                            (status, timestamp))
         
         conn.commit()
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+        
+        # Let push subscribers know, including the zone and camera they filter on
+        if updated and event_broker.subscriptions:
+            row = conn.execute('SELECT * FROM detections WHERE timestamp = ?', (timestamp,)).fetchone()
+            if row:
+                detection = dict(row)
+                detection['forCleaning'] = bool(detection['for_cleaning'])
+                event_broker.publish('status', detection)
+        
+        return updated
     except Error as e:
         print(f"Error updating detection status: {e}")
         return False
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+# Background video processing jobs
+VIDEO_JOB_WORKERS = int(os.environ.get('VIDEO_JOB_WORKERS', 1))
+
+# Whether jobs interrupted by a restart are processed again (1) or marked as failed (0)
+VIDEO_JOB_RESUME = os.environ.get('VIDEO_JOB_RESUME', '1') == '1'
+
+video_job_queue = queue.Queue()
+video_job_workers = []
+video_job_workers_lock = threading.Lock()
+
+def create_video_job(job_id, filename, original_path, processed_path, batch_size, stride=1):
+    """Record a newly uploaded video job in the database"""
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+        INSERT INTO video_jobs (
+            job_id, status, filename, original_path, processed_path, batch_size, stride, created_at
+        ) VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)
+        ''', (job_id, filename, original_path, processed_path, batch_size, str(stride), datetime.now().isoformat()))
+        conn.commit()
+        return True
+    except Error as e:
+        print(f"Error creating video job: {e}")
+        return False
+    finally:
+        release_db_connection(conn)
+
+def update_video_job(job_id, **fields):
+    """Update columns of a video job"""
+    conn = get_db_connection()
+    try:
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        conn.execute(f'UPDATE video_jobs SET {assignments} WHERE job_id = ?',
+                     (*fields.values(), job_id))
+        conn.commit()
+        return True
+    except Error as e:
+        print(f"Error updating video job {job_id}: {e}")
+        return False
+    finally:
+        release_db_connection(conn)
+
+def get_video_job(job_id):
+    """Get a video job as a dictionary, or None if it does not exist"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute('SELECT * FROM video_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+    except Error as e:
+        print(f"Error retrieving video job {job_id}: {e}")
+        return None
+    finally:
+        release_db_connection(conn)
+
+def format_video_job(job):
+    """Add progress and ETA information to a video job for API responses"""
+    job = dict(job)
+    frames_done = job['frames_done'] or 0
+    frames_total = job['frames_total'] or 0
+    job['progress'] = round(frames_done / frames_total, 4) if frames_total else 0.0
+    
+    # Estimate the remaining time from the processing rate so far
+    job['eta_seconds'] = None
+    if job['status'] == 'running' and job['started_at'] and frames_done:
+        elapsed = (datetime.now() - datetime.fromisoformat(job['started_at'])).total_seconds()
+        job['eta_seconds'] = round(elapsed / frames_done * max(frames_total - frames_done, 0), 1)
+    elif job['status'] == 'completed':
+        job['eta_seconds'] = 0
+    return job
+
+def run_video_job(job_id):
+    """Process the video of a queued job, recording progress as it goes"""
+    job = get_video_job(job_id)
+    if not job or job['status'] != 'queued':
+        return
+    
+    update_video_job(job_id, status='running', frames_done=0, error=None,
+                     started_at=datetime.now().isoformat())
+    
+    def progress(frames_done, frames_total):
+        update_video_job(job_id, frames_done=frames_done, frames_total=frames_total)
+    
+    try:
+        stride = parse_video_stride(job['stride'] or 1) or 1
+        process_video_file(job['original_path'], job['processed_path'], job['batch_size'], progress, stride)
+        preview_path = save_video_preview(job['original_path'], job['filename'])
+        update_video_job(job_id, status='completed', preview_path=preview_path,
+                         finished_at=datetime.now().isoformat())
+    except Exception as e:
+        print(f"Error processing video job {job_id}: {e}")
+        update_video_job(job_id, status='failed', error=str(e),
+                         finished_at=datetime.now().isoformat())
+
+def video_job_worker():
+    """Worker thread that processes queued video jobs one at a time"""
+    while True:
+        job_id = video_job_queue.get()
+        try:
+            run_video_job(job_id)
+        finally:
+            video_job_queue.task_done()
+
+def recover_video_jobs():
+    """Requeue or fail jobs that were queued or running when the server stopped"""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT job_id, original_path FROM video_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+    except Error as e:
+        print(f"Error recovering video jobs: {e}")
+        return
+    finally:
+        release_db_connection(conn)
+    
+    for row in rows:
+        if VIDEO_JOB_RESUME and os.path.exists(row['original_path']):
+            # Partial output cannot be appended to, so the job starts over
+            update_video_job(row['job_id'], status='queued', frames_done=0)
+            video_job_queue.put(row['job_id'])
+            print(f"Requeued interrupted video job {row['job_id']}")
+        else:
+            update_video_job(row['job_id'], status='failed', error='Interrupted by a server restart',
+                             finished_at=datetime.now().isoformat())
+            print(f"Marked interrupted video job {row['job_id']} as failed")
+
+def start_video_job_workers():
+    """Start the video job worker threads once, recovering any interrupted jobs first"""
+    with video_job_workers_lock:
+        if video_job_workers:
+            return
+        recover_video_jobs()
+        for i in range(max(1, VIDEO_JOB_WORKERS)):
+            worker = threading.Thread(target=video_job_worker, name=f'video-job-{i}', daemon=True)
+            worker.start()
+            video_job_workers.append(worker)
+
+def submit_video_job(file, stride=1):
+    """Save an uploaded video and queue it for background processing"""
+    job_id = uuid.uuid4().hex
+    
+    # Prefix the job ID so uploads with the same name do not overwrite each other
+    filename = f"{job_id[:8]}_{secure_filename(file.filename)}"
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(filepath)
+    image_index.add(filepath)
+    processed_path = os.path.join(app.config['PROCESSED_FOLDER'], 'processed_' + filename)
+    batch_size = parse_video_batch_size(request.form.get('batch_size', VIDEO_BATCH_SIZE, type=int))
+    
+    # Start the workers first so recovering interrupted jobs does not pick up this one
+    start_video_job_workers()
+    if not create_video_job(job_id, filename, filepath, processed_path, batch_size, stride):
+        return jsonify({'success': False, 'error': 'Failed to create video job'}), 500
+    
+    video_job_queue.put(job_id)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f"{request.host_url.rstrip('/')}/video_jobs/{job_id}"
+    }), 202
+
+@app.route('/video_jobs', methods=['POST'])
+def api_submit_video_job():
+    """API endpoint to upload a video for background processing"""
+    if 'video' not in request.files:
+        return jsonify({'error': 'No video uploaded'}), 400
+    
+    file = request.files['video']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    
+    stride = parse_video_stride(request.form.get('stride', VIDEO_STRIDE))
+    if stride is None:
+        return jsonify({'error': "Stride must be a positive number of frames or 'auto'"}), 400
+    
+    return submit_video_job(file, stride)
+
+@app.route('/video_jobs', methods=['GET'])
+def api_list_video_jobs():
+    """API endpoint to list the most recent video jobs"""
+    limit = request.args.get('limit', 20, type=int)
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('SELECT * FROM video_jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+    except Error as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        release_db_connection(conn)
+    
+    return jsonify({
+        'success': True,
+        'jobs': [format_video_job(row) for row in rows]
+    })
+
+@app.route('/video_jobs/<job_id>', methods=['GET'])
+def api_get_video_job(job_id):
+    """API endpoint to poll the progress of a video job"""
+    start_video_job_workers()
+    job = get_video_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job': format_video_job(job)
+    })
 
 # New Flask API endpoints for the mobile app
 @app.route('/api/detections', methods=['GET'])
 def api_get_detections():
-    """API endpoint to get all detections"""
-    detections = get_detections_from_db()
+    """API endpoint to get a page of detections, filtered by the query parameters"""
+    filters, limit, cursor = detection_query_from_request(request.args)
+    detections, next_cursor = get_detections_from_db(filters, limit, cursor)
     return jsonify({
         'success': True,
-        'detections': detections
+        'detections': detections,
+        'next_cursor': next_cursor
     })
 
 @app.route('/api/detections', methods=['POST'])
@@ -1132,7 +3416,9 @@ def api_add_detection():
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
         # Add to detection_history for backward compatibility
+        mark_detection_changed(data)
         detection_history.append(data)
+        event_broker.publish('detection', data)
         
         # Save to database
         success = save_detection_to_db(data)
@@ -1144,6 +3430,132 @@ def api_add_detection():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Most detections one bulk request may carry, and the bytes of an NDJSON body read at a time
+BULK_INGEST_MAX_ITEMS = int(os.environ.get('BULK_INGEST_MAX_ITEMS', 100000))
+BULK_INGEST_READ_SIZE = 256 * 1024
+
+# Fields a bulk detection may carry as text, besides the required timestamp
+BULK_TEXT_FIELDS = ('class', 'status', 'image_path', 'camera_id', 'zone_name', 'location')
+
+def validate_bulk_detection(item):
+    """Error message for a bulk detection that cannot be stored, or None if it is valid"""
+    if not isinstance(item, dict):
+        return 'Detection must be a JSON object'
+    timestamp = item.get('timestamp')
+    if not isinstance(timestamp, str) or not timestamp:
+        # The timestamp is the primary key: a default would make replayed items overwrite each other
+        return 'timestamp is required'
+    confidence = item.get('confidence', 0.0)
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+        return 'confidence must be a number between 0 and 1'
+    for field in BULK_TEXT_FIELDS:
+        if field in item and not isinstance(item[field], str):
+            return f'{field} must be a string'
+    if not isinstance(item.get('forCleaning', True), (bool, int)):
+        return 'forCleaning must be a boolean'
+    return None
+
+def ndjson_lines(stream, chunk_size=BULK_INGEST_READ_SIZE):
+    """Non-empty lines of an NDJSON stream, read chunk_size bytes at a time"""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+def bulk_detection_items():
+    """(index, detection or None, parse error) for each detection in a JSON array or NDJSON body"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        # Parsed line by line as the body arrives in chunks, so the whole upload is never
+        # held as one string and the stream is not read one line at a time
+        index = 0
+        for line in ndjson_lines(request.stream):
+            try:
+                yield index, json.loads(line), None
+            except ValueError as e:
+                yield index, None, f'Invalid JSON: {e}'
+            index += 1
+        return
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('detections')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of detections, {"detections": [...]} or NDJSON')
+    for index, item in enumerate(data):
+        yield index, item, None
+
+@app.route('/api/detections/bulk', methods=['POST'])
+def api_add_detections_bulk():
+    """
+    API endpoint to add many detections at once, e.g. ones an edge device buffered offline.
+    
+    Takes a JSON array (or {"detections": [...]}) or an NDJSON stream with
+    Content-Type application/x-ndjson. The whole body is read and validated first, then
+    the valid detections are inserted with executemany in one short transaction; each
+    item gets its own result, so a device can retry just the rejected ones.
+    """
+    created_at = datetime.now().isoformat()
+    results = []
+    accepted = []
+    rows = []
+    try:
+        for index, item, error in bulk_detection_items():
+            if index >= BULK_INGEST_MAX_ITEMS:
+                return jsonify({'success': False, 'error': f'At most {BULK_INGEST_MAX_ITEMS} detections per request'}), 413
+            error = error or validate_bulk_detection(item)
+            if error:
+                results.append({'index': index, 'status': 'error', 'error': error})
+                continue
+            results.append({'index': index, 'status': 'ok', 'timestamp': item['timestamp']})
+            accepted.append(item)
+            rows.append(detection_row(item, created_at))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # The write lock is only taken once the upload has been read, so a slow client
+    # never holds up detections and status updates from other writers
+    if rows:
+        conn = get_db_connection()
+        try:
+            conn.executemany(INSERT_DETECTION_SQL, rows)
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            print(f"Error saving detections to database: {e}")
+            return jsonify({'success': False, 'error': f'Database error, nothing was stored: {e}'}), 500
+        finally:
+            release_db_connection(conn)
+    
+    # Only committed detections reach detection_history, and only the newest of them so it
+    # stays as capped as record_detections keeps it. Push clients get one summary event
+    if accepted:
+        for detection in accepted[-DETECTION_HISTORY_SIZE:]:
+            mark_detection_changed(detection)
+            detection_history.append(detection)
+        del detection_history[:-DETECTION_HISTORY_SIZE]
+        event_broker.publish('bulk', {
+            'count': len(accepted),
+            'version': history_version,
+            'zones': sorted({detection.get('zone_name', 'Unknown Zone') for detection in accepted}),
+            'cameras': sorted({detection.get('camera_id', 'unknown') for detection in accepted})
+        })
+    
+    return jsonify({
+        'success': len(accepted) == len(results),
+        'inserted': len(accepted),
+        'failed': len(results) - len(accepted),
+        'version': history_version,
+        'results': results
+    })
+
 @app.route('/api/detections/<timestamp>', methods=['PUT', 'PATCH'])
 def api_update_detection(timestamp):
     """API endpoint to update a detection status"""
@@ -1164,6 +3576,7 @@ def api_update_detection(timestamp):
                     detection['cleaned_by'] = data.get('cleanedBy')
                     detection['cleaned_at'] = datetime.now().isoformat()
                     detection['notes'] = data.get('notes')
+                mark_detection_changed(detection)
                 break
         
         # Update in database
@@ -1229,6 +3642,8 @@ def add_sample_data():
         save_detection_to_db(detection)
         
     # Also add to detection_history for backward compatibility
+    for detection in sample_detections:
+        mark_detection_changed(detection)
     detection_history.extend(sample_detections)
     
     return jsonify({
@@ -1267,7 +3682,7 @@ def get_image_base64(filename):
         
         # If none of the paths exist, use a placeholder
         if full_path is None:
-            full_path = os.path.join('static', 'images', 'placeholder-image.jpg')
+            full_path = PLACEHOLDER_PATH
             print(f"Image not found at any location, using placeholder: {full_path}")
         
         # Check if file exists and is readable
@@ -1278,8 +3693,9 @@ def get_image_base64(filename):
                 'possible_paths': possible_paths
             }), 404
             
-        # Read the file and encode as base64
-        with open(full_path, 'rb') as image_file:
+        # Read the file (or its requested ?w=&q= variant) and encode as base64
+        variant_path, etag = image_variant_path(full_path)
+        with open(variant_path, 'rb') as image_file:
             encoded_image = base64.b64encode(image_file.read()).decode('utf-8')
             
         return jsonify({
@@ -1296,6 +3712,101 @@ def get_image_base64(filename):
             'error': str(e)
         }), 500
 
+# Most images one /images/batch request may ask for
+IMAGE_BATCH_MAX = int(os.environ.get('IMAGE_BATCH_MAX', 100))
+
+# Bytes read from disk at a time while streaming a batch
+IMAGE_BATCH_CHUNK_SIZE = 64 * 1024
+
+# Folders /images/batch serves from; other paths are reported missing
+IMAGE_BATCH_FOLDERS = [UPLOAD_FOLDER, DETECTION_FOLDER, PROCESSED_PHOTOS_FOLDER, os.path.dirname(PLACEHOLDER_PATH)]
+
+IMAGE_MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif'
+}
+
+def find_batch_image(filename):
+    """Path of the stored image the client's image_path refers to, or None if it is not in an image folder"""
+    roots = [os.path.realpath(folder) for folder in IMAGE_BATCH_FOLDERS]
+    for path in [filename] + [os.path.join(folder, filename) for folder in IMAGE_BATCH_FOLDERS]:
+        real_path = os.path.realpath(path)
+        if any(real_path.startswith(root + os.sep) for root in roots) and os.path.isfile(real_path):
+            return real_path
+    return None
+
+def image_batch_frames(items):
+    """Yield each image as a 4 byte big-endian header length, a JSON header and the raw image bytes"""
+    for header, path in items:
+        encoded = json.dumps(header).encode()
+        yield struct.pack('>I', len(encoded)) + encoded
+        if path is None:
+            continue
+        remaining = header['length']
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            # Removed since it was measured (e.g. an evicted variant): keep the framing intact
+            yield bytes(remaining)
+            continue
+        with f:
+            while remaining:
+                chunk = f.read(min(IMAGE_BATCH_CHUNK_SIZE, remaining))
+                if not chunk:
+                    # The file shrank since it was measured: pad to keep the framing intact
+                    yield bytes(remaining)
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+@app.route('/images/batch', methods=['GET', 'POST'])
+def image_batch():
+    """
+    Stream several detection images in one binary response, without base64 or JSON escaping.
+    
+    Paths come from repeated ?path= parameters or a JSON body {"paths": [...]}; ?w= and ?q=
+    select resized variants as on /view_image. Each image is framed as a 4 byte big-endian
+    length, a UTF-8 JSON header {"path", "status", "mime_type", "length"} and then `length`
+    bytes of the image. Missing images have status "missing" and length 0.
+    """
+    paths = request.args.getlist('path')
+    if request.is_json:
+        data = request.get_json(silent=True)
+        body_paths = data.get('paths', []) if isinstance(data, dict) else None
+        if not isinstance(body_paths, list) or not all(isinstance(path, str) for path in body_paths):
+            return jsonify({'success': False, 'error': 'Expected a JSON body {"paths": [...]} listing image paths'}), 400
+        paths += body_paths
+    if not paths:
+        return jsonify({'success': False, 'error': 'No image paths given'}), 400
+    if len(paths) > IMAGE_BATCH_MAX:
+        return jsonify({'success': False, 'error': f'At most {IMAGE_BATCH_MAX} images per batch'}), 400
+    
+    # Resolve and measure every image up front, so the response has a Content-Length and the
+    # stream itself only reads files (it runs after this request context has ended)
+    items = []
+    for requested in paths:
+        path = find_batch_image(requested)
+        if path is None:
+            items.append(({'path': requested, 'status': 'missing', 'mime_type': None, 'length': 0}, None))
+            continue
+        path, etag = image_variant_path(path)
+        file_ext = path.rsplit('.', 1)[1].lower() if '.' in path else 'jpg'
+        header = {
+            'path': requested,
+            'status': 'ok',
+            'mime_type': IMAGE_MIME_TYPES.get(file_ext, 'application/octet-stream'),
+            'length': os.path.getsize(path)
+        }
+        items.append((header, path))
+    
+    total = sum(4 + len(json.dumps(header).encode()) + header['length'] for header, path in items)
+    response = Response(image_batch_frames(items), mimetype='application/x-image-batch')
+    response.headers['Content-Length'] = str(total)
+    response.headers['X-Image-Count'] = str(len(items))
+    return response
+
 # Direct uploads access - simple endpoint to serve any file in the uploads folder
 @app.route('/uploads-direct/<filename>')
 def uploads_direct(filename):
@@ -1306,35 +3817,17 @@ def uploads_direct(filename):
     filepath = os.path.join(UPLOAD_FOLDER, filename)
     if os.path.exists(filepath) and os.path.isfile(filepath):
         print(f"DEBUG: Serving direct file from uploads: {filepath}")
-        return send_file(filepath)
+        return send_image(filepath)
     
-    # No exact match, look for similar filename
-    if os.path.exists(UPLOAD_FOLDER):
-        for file in os.listdir(UPLOAD_FOLDER):
-            # Check if this file contains the requested filename (partial match)
-            if filename in file and file.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                filepath = os.path.join(UPLOAD_FOLDER, file)
-                print(f"DEBUG: Serving similar file from uploads: {filepath}")
-                return send_file(filepath)
+    # No exact match, look for an image whose name starts with the requested one
+    filepath = image_index.find_prefix(UPLOAD_FOLDER, os.path.splitext(filename)[0])
+    if filepath:
+        print(f"DEBUG: Serving similar file from uploads: {filepath}")
+        return send_image(filepath)
     
     # If no image found, serve placeholder
     print(f"DEBUG: No file found in uploads for {filename}, serving placeholder")
-    placeholder_path = os.path.join('static', 'images', 'placeholder-image.jpg')
-    
-    # Ensure placeholder exists
-    if not os.path.exists(placeholder_path):
-        placeholder_dir = os.path.join('static', 'images')
-        os.makedirs(placeholder_dir, exist_ok=True)
-        
-        placeholder = np.zeros((300, 300, 3), dtype=np.uint8)
-        placeholder[:] = (200, 200, 200)  # Gray background
-        cv2.putText(placeholder, "File Not Found", (60, 130), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
-        cv2.putText(placeholder, filename[:20], (60, 170), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-        cv2.imwrite(placeholder_path, placeholder)
-        
-    return send_file(placeholder_path)
+    return send_placeholder()
 
 # Simple endpoint that serves images by timestamp
 @app.route('/image-by-timestamp/<timestamp>')
@@ -1364,38 +3857,22 @@ def image_by_timestamp(timestamp):
         for path in possible_paths:
             if os.path.exists(path) and os.path.isfile(path):
                 print(f"DEBUG: Serving image from path: {path}")
-                return send_file(path)
+                return send_image(path)
     
-    # Try to find any image with the timestamp in its name
+    # Try to find an image named after the timestamp, as is or as save_snapshot writes it
+    safe_timestamp = timestamp.replace(' ', '_').replace(':', '_')
+    snapshot_timestamp = timestamp.replace(' ', '_').replace(':', '-')
     for folder in [UPLOAD_FOLDER, DETECTION_FOLDER]:
-        if os.path.exists(folder):
-            for file in os.listdir(folder):
-                # Replace spaces and colons in the timestamp for comparison
-                safe_timestamp = timestamp.replace(' ', '_').replace(':', '_')
-                if safe_timestamp in file and file.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                    filepath = os.path.join(folder, file)
-                    print(f"DEBUG: Found image with matching timestamp: {filepath}")
-                    return send_file(filepath)
-    
-    # If no image found, create and serve a custom placeholder
-    print(f"DEBUG: No image found for timestamp {timestamp}, creating custom placeholder")
-    
-    # Create a custom placeholder with timestamp information
-    placeholder_dir = os.path.join('static', 'images')
-    os.makedirs(placeholder_dir, exist_ok=True)
-    placeholder_path = os.path.join(placeholder_dir, f'placeholder-{timestamp}.jpg')
-    
-    placeholder = np.zeros((300, 300, 3), dtype=np.uint8)
-    placeholder[:] = (200, 200, 200)  # Gray background
+        for prefix in (safe_timestamp, f'detection_{safe_timestamp}', f'detection_{snapshot_timestamp}'):
+            filepath = image_index.find_prefix(folder, prefix)
+            if filepath:
+                print(f"DEBUG: Found image with matching timestamp: {filepath}")
+                return send_image(filepath)
     
-    # Add text with timestamp
-    cv2.putText(placeholder, "Image Not Found", (50, 100), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
-    cv2.putText(placeholder, timestamp, (50, 150), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-                
-    cv2.imwrite(placeholder_path, placeholder)
-    return send_file(placeholder_path, mimetype='image/jpeg')
+    # If no image found, serve a placeholder showing the timestamp
+    print(f"DEBUG: No image found for timestamp {timestamp}, serving placeholder")
+    return send_placeholder(render_placeholder((("Image Not Found", (50, 100), 0.7, 2),
+                                                (timestamp, (50, 150), 0.5, 1))))
 
 # Fix URL encoding issues with spaces in filenames
 @app.route('/image-direct/<path:filename>')
@@ -1414,43 +3891,32 @@ def image_direct(filename):
         filepath = os.path.join(UPLOAD_FOLDER, name)
         if os.path.exists(filepath) and os.path.isfile(filepath):
             print(f"DEBUG: Serving direct image from uploads: {filepath}")
-            return send_file(filepath)
+            return send_image(filepath)
         
         # Try full path
         if os.path.exists(name) and os.path.isfile(name):
             print(f"DEBUG: Serving direct image from full path: {name}")
-            return send_file(name)
-    
-    # If no exact match, try to list the uploads folder and find a similar filename
-    if os.path.exists(UPLOAD_FOLDER):
-        for file in os.listdir(UPLOAD_FOLDER):
-            # Check if the file names are similar (ignoring spaces/underscores/etc)
-            clean_file = file.replace(' ', '').replace('_', '').lower()
-            clean_filename = filename.replace(' ', '').replace('_', '').lower()
-            clean_decoded = decoded_filename.replace(' ', '').replace('_', '').lower()
-            
-            if (clean_file in clean_filename or clean_filename in clean_file or
-                clean_file in clean_decoded or clean_decoded in clean_file):
-                filepath = os.path.join(UPLOAD_FOLDER, file)
-                print(f"DEBUG: Found similar file (ignoring spaces/underscores): {filepath}")
-                return send_file(filepath)
-    
-    # If no image found, create and serve a custom placeholder
-    print(f"DEBUG: No image found for direct access, creating placeholder")
-    placeholder_dir = os.path.join('static', 'images')
-    os.makedirs(placeholder_dir, exist_ok=True)
-    placeholder_path = os.path.join(placeholder_dir, f'placeholder-image-direct.jpg')
+            return send_image(name)
     
-    placeholder = np.zeros((300, 300, 3), dtype=np.uint8)
-    placeholder[:] = (200, 200, 200)  # Gray background
-    cv2.putText(placeholder, "File Not Found", (60, 130), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
-    cv2.putText(placeholder, filename[:20], (60, 170), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-    cv2.imwrite(placeholder_path, placeholder)
+    # If no exact match, find a similar filename in uploads (ignoring spaces/underscores/case)
+    for name in [filename, decoded_filename]:
+        filepath = image_index.find_normalized(UPLOAD_FOLDER, os.path.basename(name))
+        if filepath:
+            print(f"DEBUG: Found similar file (ignoring spaces/underscores): {filepath}")
+            return send_image(filepath)
     
-    return send_file(placeholder_path, mimetype='image/jpeg')
+    # If no image found, serve a placeholder showing the filename
+    print(f"DEBUG: No image found for direct access, serving placeholder")
+    return send_placeholder(render_placeholder((("File Not Found", (60, 130), 0.7, 2),
+                                                (filename[:20], (60, 170), 0.5, 1))))
 
 if __name__ == '__main__':
+    # The debug reloader also imports this module in a watcher process, so only
+    # start the background workers in the process that serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_model_warmup()
+        start_video_job_workers()
+        threading.Thread(target=remove_generated_placeholders, name='placeholder-cleanup', daemon=True).start()
+    
     # Listen on all interfaces (important for mobile access)
     app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
@@ -0,0 +1,1198 @@
+"""
+Benchmarks for the garbage detection server.
+
+Run from the project root so the model weights and media folders resolve:
+
+    python benchmark.py video-batch [--video PATH] [--batch-sizes 1 4 8 16]
+    python benchmark.py video-pipeline [--video PATH] [--batch-size 8]
+    python benchmark.py video-stride [--video PATH] [--strides 1 2 3 5 10 auto]
+    python benchmark.py snapshots [--video PATH]
+    python benchmark.py db-load [--readers 16] [--seconds 5]
+    python benchmark.py db-query [--sizes 10000 100000 1000000]
+    python benchmark.py scheduler [--streams 8] [--seconds 10]
+    python benchmark.py backends [--backends torch onnx] [--runs 20]
+    python benchmark.py quantization [--images Media processed_photos] [--iou 0.5]
+    python benchmark.py cold-start [--app-dir .] [--runs 3]
+    python benchmark.py first-request [--app-dir .] [--repeat 10]
+    python benchmark.py workers [--workers 0 1 2 4] [--clients 8] [--seconds 10]
+    python benchmark.py frame-transport [--cameras 4] [--size 1920 1080] [--frames 60]
+    python benchmark.py postprocess [--boxes 1 10 100 300 1000] [--repeat 200]
+    python benchmark.py thumbnails [--images 20] [--widths 320 480] [--quality 70]
+    python benchmark.py image-index [--files 10000 100000 1000000] [--lookups 200]
+    python benchmark.py image-batch [--images 20] [--width 480]
+    python benchmark.py bulk-ingest [--sizes 1000 10000 100000] [--single-rows 2000]
+"""
+import argparse
+import collections
+import json
+import os
+import resource
+import sqlite3
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+MEDIA_FOLDER = 'Media'
+
+
+def make_sample_video(path, frame_count=64, size=(640, 480), fps=30):
+    """Build a short clip from the images in Media/, panning slowly across each one"""
+    images = []
+    for name in sorted(os.listdir(MEDIA_FOLDER)):
+        image = cv2.imread(os.path.join(MEDIA_FOLDER, name))
+        if image is not None:
+            images.append(cv2.resize(image, (size[0] + 64, size[1] + 64)))
+    if not images:
+        raise SystemExit(f'No images found in {MEDIA_FOLDER}/')
+
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    per_image = max(1, frame_count // len(images))
+    for i in range(frame_count):
+        image = images[(i // per_image) % len(images)]
+        offset = i % per_image
+        out.write(image[offset:offset + size[1], offset:offset + size[0]])
+    out.release()
+    return path
+
+
+def read_frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_video_batch(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames)
+
+    # Let the scheduler run every tested batch size as a single forward pass
+    app.inference_scheduler.max_batch = max(app.inference_scheduler.max_batch, *args.batch_sizes)
+
+    # Warm the model up so the first batch size is not penalised
+    app.process_frame(read_frames(video)[0])
+
+    reference = None
+    print(f'{"batch":>6} {"frames":>7} {"seconds":>8} {"fps":>8}  output')
+    for batch_size in args.batch_sizes:
+        processed_path = os.path.join(workdir, f'processed_b{batch_size}.mp4')
+        start = time.perf_counter()
+        frame_count = app.process_video_file(video, processed_path, batch_size)
+        elapsed = time.perf_counter() - start
+
+        # Compare the decoded output against the first batch size run
+        frames = read_frames(processed_path)
+        if reference is None:
+            reference = frames
+            verdict = 'reference'
+        else:
+            diff = max((int(np.abs(a.astype(np.int16) - b).max()) for a, b in zip(frames, reference)), default=0)
+            same = len(frames) == len(reference) and diff == 0
+            verdict = 'identical' if same else f'differs (max pixel diff {diff})'
+        print(f'{batch_size:>6} {frame_count:>7} {elapsed:>8.2f} {frame_count / elapsed:>8.1f}  {verdict}')
+
+
+def process_video_serially(app, filepath, processed_path, batch_size):
+    """The old single-threaded read / infer / write loop, kept here as a baseline"""
+    cap = cv2.VideoCapture(filepath)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    out = cv2.VideoWriter(processed_path, cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS), (width, height))
+    # Tracked like the pipelined path, so both record the same events
+    tracker = app.DetectionTracker()
+    frame_count = 0
+    batch = []
+    while True:
+        ret, frame = cap.read()
+        if ret:
+            batch.append(frame)
+        if batch and (len(batch) >= batch_size or not ret):
+            for frame, result in zip(batch, app.run_model(batch)):
+                processed_frame, detection = app.annotate_frame(frame, [result], tracker=tracker)
+                out.write(processed_frame)
+            frame_count += len(batch)
+            batch = []
+        if not ret:
+            break
+    cap.release()
+    out.release()
+    return frame_count
+
+
+def bench_video_pipeline(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames)
+    app.process_frame(read_frames(video)[0])
+
+    timings = {}
+    outputs = {}
+    for name, run in [('serial', lambda src, dst: process_video_serially(app, src, dst, args.batch_size)),
+                      ('pipelined', lambda src, dst: app.process_video_file(src, dst, args.batch_size))]:
+        processed_path = os.path.join(workdir, f'processed_{name}.mp4')
+        start = time.perf_counter()
+        frame_count = run(video, processed_path)
+        timings[name] = time.perf_counter() - start
+        outputs[name] = read_frames(processed_path)
+        print(f'{name:>10}: {frame_count} frames in {timings[name]:.2f}s ({frame_count / timings[name]:.1f} fps)')
+
+    same = len(outputs['serial']) == len(outputs['pipelined']) and all(
+        np.array_equal(a, b) for a, b in zip(outputs['serial'], outputs['pipelined']))
+    print(f'speedup: {timings["serial"] / timings["pipelined"]:.2f}x, output {"identical" if same else "differs"}')
+
+
+def frame_recall(expected, drawn, iou_threshold=0.5):
+    """Count the expected boxes that a drawn box of the same class overlaps enough"""
+    from app import box_iou
+    return sum(1 for box in expected
+               if any(other[5] == box[5] and box_iou(box, other) >= iou_threshold for other in drawn))
+
+
+def bench_video_stride(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames)
+    app.process_frame(read_frames(video)[0])
+
+    # Record the boxes drawn on every output frame and the frames sent to the model
+    drawn = []
+    inferred = [0]
+    draw_detections, run_model = app.draw_detections, app.run_model
+
+    def recording_draw(frame, detections):
+        drawn.append(list(detections))
+        return draw_detections(frame, detections)
+
+    def counting_run_model(source):
+        inferred[0] += len(source) if isinstance(source, list) else 1
+        return run_model(source)
+
+    app.draw_detections, app.run_model = recording_draw, counting_run_model
+
+    reference = None
+    print(f'{"stride":>7} {"frames":>7} {"inferred":>9} {"saved":>7} {"recall":>7} {"fps":>7}')
+    for value in args.strides:
+        stride = app.parse_video_stride(value)
+        drawn.clear()
+        inferred[0] = 0
+        start = time.perf_counter()
+        frame_count = app.process_video_file(video, os.path.join(workdir, f'processed_s{value}.mp4'),
+                                             args.batch_size, stride=stride)
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = list(drawn)
+        expected = sum(len(boxes) for boxes in reference)
+        matched = sum(frame_recall(boxes, other) for boxes, other in zip(reference, drawn))
+        recall = matched / expected if expected else 1.0
+        saved = 1 - inferred[0] / frame_count
+        print(f'{value:>7} {frame_count:>7} {inferred[0]:>9} {saved:>7.1%} {recall:>7.1%} {frame_count / elapsed:>7.1f}')
+
+
+def bytes_written():
+    """Bytes this process has passed to write() so far (Linux only)"""
+    with open('/proc/self/io') as f:
+        for line in f:
+            if line.startswith('wchar:'):
+                return int(line.split()[1])
+    return 0
+
+
+def bench_snapshots(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames)
+    app.process_frame(read_frames(video)[0])
+    app.snapshot_queue.join()
+
+    record_detections, save_snapshot = app.record_detections, app.save_snapshot
+    legacy_writes = [0]
+
+    def legacy_record(frame, detections):
+        # What process_frame used to do: a synchronous full-frame write per detection
+        for _ in detections:
+            image_path = os.path.join(app.UPLOAD_FOLDER, f'detection_{datetime.now():%Y-%m-%d_%H-%M-%S}.jpg')
+            cv2.imwrite(image_path, frame)
+            os.path.exists(image_path)
+            legacy_writes[0] += 1
+        app.save_snapshot = lambda frame: 'legacy.jpg'
+        try:
+            return record_detections(frame, detections)
+        finally:
+            app.save_snapshot = save_snapshot
+
+    def snapshot_count():
+        return sum(1 for name in os.listdir(app.UPLOAD_FOLDER) if name.startswith('detection_'))
+
+    print(f'{"mode":>8} {"frames":>7} {"writes":>7} {"MB written":>11} {"seconds":>8} {"fps":>7}')
+    for mode in ('before', 'after'):
+        app.record_detections = legacy_record if mode == 'before' else record_detections
+        files_before = snapshot_count()
+        legacy_writes[0] = 0
+        written = bytes_written()
+        start = time.perf_counter()
+        frame_count = app.process_video_file(video, os.path.join(workdir, f'processed_{mode}.mp4'), args.batch_size)
+        app.snapshot_queue.join()
+        elapsed = time.perf_counter() - start
+        written = bytes_written() - written
+        writes = legacy_writes[0] if mode == 'before' else snapshot_count() - files_before
+        print(f'{mode:>8} {frame_count:>7} {writes:>7} {written / 1e6:>11.1f} {elapsed:>8.2f} {frame_count / elapsed:>7.1f}')
+    app.record_detections = record_detections
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_db_load(app, readers, seconds, write_rate):
+    """Hammer the detections store with concurrent readers and one writer at a fixed rate"""
+    read_latencies, write_latencies, errors = [], [], []
+    stop = threading.Event()
+    counter = iter(range(10 ** 9))
+
+    def reader():
+        with app.app.test_request_context():
+            while not stop.is_set():
+                start = time.perf_counter()
+                app.get_detections_from_db()
+                read_latencies.append(time.perf_counter() - start)
+
+    def writer():
+        # A fixed write rate keeps the table growing equally fast in every mode
+        while not stop.wait(1 / write_rate):
+            start = time.perf_counter()
+            if not app.save_detection_to_db({'timestamp': f'load-{next(counter)}', 'class': 'garbage'}):
+                errors.append('write failed')
+            write_latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return read_latencies, write_latencies, errors
+
+
+def bench_db_load(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    get_db_connection, release_db_connection = app.get_db_connection, app.release_db_connection
+
+    print(f'{"mode":>7} {"reads/s":>8} {"read p50":>9} {"read p99":>9} {"writes/s":>9} {"write p50":>10} {"write p99":>10} {"errors":>7}')
+    for mode in ('before', 'after'):
+        app.DB_PATH = os.path.join(workdir, f'{mode}.db')
+        app.init_db()
+        if mode == 'before':
+            # The old behaviour: a fresh connection per call on a rollback-journal database
+            with sqlite3.connect(app.DB_PATH) as conn:
+                conn.execute('PRAGMA journal_mode=DELETE')
+
+            def connect_per_call():
+                conn = sqlite3.connect(app.DB_PATH)
+                conn.row_factory = sqlite3.Row
+                return conn
+
+            app.get_db_connection, app.release_db_connection = connect_per_call, lambda conn: conn.close()
+        else:
+            app.get_db_connection, app.release_db_connection = get_db_connection, release_db_connection
+            app.db_pool = app.ConnectionPool(app.DB_PATH, app.DB_POOL_SIZE)
+
+        for i in range(args.rows):
+            app.save_detection_to_db({'timestamp': f'seed-{i:07d}', 'class': 'garbage', 'confidence': 0.5})
+
+        reads, writes, errors = run_db_load(app, args.readers, args.seconds, args.write_rate)
+        print(f'{mode:>7} {len(reads) / args.seconds:>8.0f} {percentile(reads, 0.5) * 1000:>7.2f}ms '
+              f'{percentile(reads, 0.99) * 1000:>7.2f}ms {len(writes) / args.seconds:>9.0f} '
+              f'{percentile(writes, 0.5) * 1000:>8.2f}ms {percentile(writes, 0.99) * 1000:>8.2f}ms {len(errors):>7}')
+
+
+def bench_db_query(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    app.DB_PATH = os.path.join(workdir, 'query.db')
+    app.init_db()
+    app.db_pool = app.ConnectionPool(app.DB_PATH, app.DB_POOL_SIZE)
+
+    queries = [
+        ('newest page', {}),
+        ('status=pending', {'status': 'pending'}),
+        ('zone=Zone 3', {'zone': 'Zone 3'}),
+        ('for_cleaning=1', {'for_cleaning': 1}),
+        ('camera+class', {'camera': 'camera_2', 'class': 'trash'}),
+    ]
+    statuses = ['pending', 'cleaned']
+    classes = ['garbage', 'garbage_bag', 'trash']
+
+    rows = 0
+    print(f'{"rows":>9} {"query":>16} {"page 1":>9} {"page 50":>9}')
+    with app.app.test_request_context():
+        for size in args.sizes:
+            # Grow the table to the next size with synthetic detections
+            conn = app.get_db_connection()
+            with conn:
+                conn.executemany(
+                    'INSERT INTO detections (timestamp, class, confidence, status, image_path, for_cleaning, '
+                    'camera_id, zone_name, location, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    ((f'2025-01-01 00:00:00.{i:09d}', classes[i % 3], 0.5, statuses[i % 7 == 0], f'uploads/{i}.jpg',
+                      i % 4 != 0, f'camera_{i % 5}', f'Zone {i % 10}', 'Somewhere', '') for i in range(rows, size)))
+            app.release_db_connection(conn)
+            rows = size
+
+            for name, filters in queries:
+                timings = []
+                cursor = None
+                for page in range(50):
+                    start = time.perf_counter()
+                    detections, cursor = app.get_detections_from_db(filters, app.DETECTIONS_PAGE_SIZE, cursor)
+                    timings.append(time.perf_counter() - start)
+                    if not cursor:
+                        break
+                print(f'{size:>9} {name:>16} {timings[0] * 1000:>7.2f}ms {timings[-1] * 1000:>7.2f}ms')
+
+
+def bench_scheduler(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames)
+    frames = read_frames(video)
+    app.process_frame(frames[0])
+
+    def per_frame(frame):
+        # The old run_model: one locked forward pass per frame
+        with app.model_lock:
+            return app.get_model()(frame)
+
+    print(f'{"mode":>10} {"streams":>8} {"frames":>7} {"fps":>7} {"p50":>9} {"p95":>9}')
+    for mode, infer in (('per-frame', per_frame), ('scheduler', app.run_model)):
+        latencies = []
+        stop = threading.Event()
+
+        def stream(offset):
+            # Each simulated camera feeds its next frame as soon as the previous one is done
+            i = offset
+            while not stop.is_set():
+                start = time.perf_counter()
+                infer(frames[i % len(frames)])
+                latencies.append(time.perf_counter() - start)
+                i += 1
+
+        threads = [threading.Thread(target=stream, args=(i * 7,)) for i in range(args.streams)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        print(f'{mode:>10} {args.streams:>8} {len(latencies):>7} {len(latencies) / args.seconds:>7.1f} '
+              f'{percentile(latencies, 0.5) * 1000:>7.1f}ms {percentile(latencies, 0.95) * 1000:>7.1f}ms')
+    print('batch sizes:', app.inference_scheduler.stats()['batch_sizes'])
+
+
+def measure_backend(args):
+    """Load one backend in this (fresh) process and write its timings, memory and boxes to args.output"""
+    os.environ['INFERENCE_BACKEND'] = args.worker
+    frames = read_frames(args.video)
+
+    start = time.perf_counter()
+    import app
+    model = app.get_model()
+    load_seconds = time.perf_counter() - start
+    model(frames[0])
+
+    latencies = []
+    for i in range(args.runs):
+        start = time.perf_counter()
+        model(frames[i % len(frames)])
+        latencies.append(time.perf_counter() - start)
+
+    batch = [frames[i % len(frames)] for i in range(8)]
+    start = time.perf_counter()
+    for _ in range(max(1, args.runs // 8)):
+        model(batch)
+    batch_fps = max(1, args.runs // 8) * len(batch) / (time.perf_counter() - start)
+
+    boxes = [[box.xyxy[0].tolist() + [float(box.conf[0]), int(box.cls[0])] for box in result.boxes]
+             for result in model(frames)]
+    with open(args.output, 'w') as f:
+        json.dump({
+            'load_seconds': load_seconds,
+            'latency_p50': percentile(latencies, 0.5),
+            'batch_fps': batch_fps,
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'torch_imported': 'torch' in sys.modules,
+            'boxes': boxes
+        }, f)
+
+
+def box_differences(reference, other):
+    """Largest corner and confidence difference to the nearest same-class box, and the box count mismatch"""
+    worst_box, worst_conf, missing = 0.0, 0.0, 0
+    for expected, actual in zip(reference, other):
+        missing += abs(len(expected) - len(actual))
+        for box in expected:
+            candidates = [b for b in actual if b[5] == box[5]]
+            if not candidates:
+                continue
+            nearest = min(candidates, key=lambda b: max(abs(p - q) for p, q in zip(box[:4], b[:4])))
+            worst_box = max(worst_box, max(abs(p - q) for p, q in zip(box[:4], nearest[:4])))
+            worst_conf = max(worst_conf, abs(box[4] - nearest[4]))
+    return worst_box, worst_conf, missing
+
+
+def bench_backends(args):
+    if args.worker:
+        return measure_backend(args)
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames)
+
+    reference = None
+    print(f'{"backend":>9} {"load":>7} {"p50":>9} {"batch fps":>10} {"peak RSS":>9} {"torch":>6} '
+          f'{"box diff":>9} {"conf diff":>10} {"count diff":>11}')
+    for backend in args.backends:
+        # Each backend gets a fresh interpreter so load time and memory are its own
+        output = os.path.join(workdir, f'{backend}.json')
+        subprocess.run([sys.executable, os.path.abspath(__file__), 'backends', '--worker', backend,
+                        '--output', output, '--video', video, '--runs', str(args.runs)],
+                       stdout=subprocess.DEVNULL, check=True)
+        with open(output) as f:
+            result = json.load(f)
+
+        if reference is None:
+            reference = result['boxes']
+        box_diff, conf_diff, count_diff = box_differences(reference, result['boxes'])
+        print(f'{backend:>9} {result["load_seconds"]:>6.2f}s {result["latency_p50"] * 1000:>7.1f}ms '
+              f'{result["batch_fps"]:>10.1f} {result["peak_rss_mb"]:>7.0f}MB {str(result["torch_imported"]):>6} '
+              f'{box_diff:>8.2f}px {conf_diff:>10.4f} {count_diff:>11}')
+
+
+def match_detections(expected, actual, iou_threshold):
+    """Greedily pair same-class boxes by IoU; returns per-class (true positive, false positive, false negative)"""
+    from app import box_iou
+
+    counts = {}
+    unmatched = list(actual)
+    for x1, y1, x2, y2, conf, cls in sorted(expected, key=lambda d: -d[4]):
+        best, best_iou = None, iou_threshold
+        for candidate in unmatched:
+            if candidate[5] == cls:
+                iou = box_iou((x1, y1, x2, y2), candidate[:4])
+                if iou >= best_iou:
+                    best, best_iou = candidate, iou
+        tp, fp, fn = counts.get(cls, (0, 0, 0))
+        if best is None:
+            counts[cls] = (tp, fp, fn + 1)
+        else:
+            unmatched.remove(best)
+            counts[cls] = (tp + 1, fp, fn)
+    for candidate in unmatched:
+        tp, fp, fn = counts.get(candidate[5], (0, 0, 0))
+        counts[candidate[5]] = (tp, fp + 1, fn)
+    return counts
+
+
+def bench_quantization(args):
+    # Both models run through ONNX Runtime, so there is no need to load torch
+    os.environ.setdefault('INFERENCE_BACKEND', 'none')
+    import app
+
+    images = app.calibration_images(args.images, limit=args.limit)
+    if not images:
+        raise SystemExit(f'No images found in {", ".join(args.images)}')
+    fp32 = app.OnnxDetector(app.export_onnx_model())
+    int8 = app.OnnxDetector(app.quantize_onnx_model())
+
+    # Detections are compared after the same 0.3 confidence cut process_frame and /detect apply
+    timings = {'fp32': [], 'int8': []}
+    counts = {}
+    for image in images:
+        outputs = {}
+        for name, detector in (('fp32', fp32), ('int8', int8)):
+            start = time.perf_counter()
+            results = detector(image)
+            timings[name].append(time.perf_counter() - start)
+            outputs[name] = app.extract_detections(results)
+        for cls, (tp, fp, fn) in match_detections(outputs['fp32'], outputs['int8'], args.iou).items():
+            total = counts.get(cls, (0, 0, 0))
+            counts[cls] = (total[0] + tp, total[1] + fp, total[2] + fn)
+
+    print(f'{len(images)} images, INT8 compared against FP32 at IoU >= {args.iou}')
+    print(f'{"class":>18} {"fp32 boxes":>11} {"int8 boxes":>11} {"precision":>10} {"recall":>8}')
+    for cls, (tp, fp, fn) in sorted(counts.items()):
+        precision = tp / (tp + fp) if tp + fp else float('nan')
+        recall = tp / (tp + fn) if tp + fn else float('nan')
+        print(f'{app.class_labels[cls]:>18} {tp + fn:>11} {tp + fp:>11} {precision:>10.1%} {recall:>8.1%}')
+    for name in ('fp32', 'int8'):
+        print(f'{name}: p50 {percentile(timings[name], 0.5) * 1000:.1f}ms per image')
+
+
+# Serves app.py from argv[1] on port argv[2] the way `python app.py` does, minus the reloader
+SERVE_SCRIPT = '''
+import sys
+sys.path.insert(0, sys.argv[1])
+import app
+from werkzeug.serving import make_server
+getattr(app, 'start_model_warmup', lambda: None)()
+make_server('127.0.0.1', int(sys.argv[2]), app.app, threaded=True).serve_forever()
+'''
+
+
+def wait_for_status(url, statuses, timeout=300):
+    """Poll the URL until it answers with one of the statuses; returns that status"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, ConnectionError):
+            status = None
+        if status in statuses:
+            return status
+        time.sleep(0.01)
+    raise SystemExit(f'{url} did not answer in {timeout}s')
+
+
+def process_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def bench_cold_start(args):
+    app_dir = os.path.abspath(args.app_dir)
+    print(f'{"run":>4} {"first /ping":>12} {"RSS":>8} {"model ready":>12} {"RSS":>8}')
+    for run in range(args.runs):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        base = f'http://127.0.0.1:{port}'
+
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, '-c', SERVE_SCRIPT, app_dir, str(port)], cwd=app_dir,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_status(base + '/ping', {200})
+            first_ping = time.perf_counter() - start
+            ping_rss = process_rss_mb(server.pid)
+
+            # Servers without /ready had the model loaded before they could answer at all
+            if wait_for_status(base + '/ready', {200, 404}) == 200:
+                model_ready = time.perf_counter() - start
+            else:
+                model_ready = first_ping
+            ready_rss = process_rss_mb(server.pid)
+        finally:
+            server.kill()
+            server.wait()
+        print(f'{run + 1:>4} {first_ping:>11.2f}s {ping_rss:>6.0f}MB {model_ready:>11.2f}s {ready_rss:>6.0f}MB')
+
+
+def post_image(url, image_bytes, field='image'):
+    """POST one JPEG as a multipart upload and return the seconds until the full response"""
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="frame.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode() + image_bytes + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(url, data=body,
+                                     headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=300) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def bench_first_request(args):
+    app_dir = os.path.abspath(args.app_dir)
+    image = next(cv2.imread(os.path.join(MEDIA_FOLDER, name)) for name in sorted(os.listdir(MEDIA_FOLDER)))
+    uploads = [cv2.imencode('.jpg', cv2.resize(image, size))[1].tobytes() for size in args.sizes]
+
+    configs = [
+        ('lazy', {'MODEL_WARMUP': 'false'}),
+        ('warm-up', {'MODEL_WARMUP': 'true'}),
+        ('warm-up+fixed', {'MODEL_WARMUP': 'true', 'MODEL_FIXED_INPUT': 'true'}),
+    ]
+    print(f'sizes {" ".join(f"{w}x{h}" for w, h in args.sizes)}, {args.repeat} steady requests per size')
+    print(f'{"config":>14} {"first max":>10} {"first each size":>30} {"steady p50":>11} {"steady p99":>11}')
+    for name, env in configs:
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        base = f'http://127.0.0.1:{port}'
+        server = subprocess.Popen([sys.executable, '-c', SERVE_SCRIPT, app_dir, str(port)], cwd=app_dir,
+                                  env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_status(base + '/ping', {200})
+            if env['MODEL_WARMUP'] == 'true':
+                wait_for_status(base + '/ready', {200})
+
+            # The first request at each size, then steady state across all of them
+            first = [post_image(base + '/detect', upload) for upload in uploads]
+            steady = [post_image(base + '/detect', upload) for _ in range(args.repeat) for upload in uploads]
+        finally:
+            server.kill()
+            server.wait()
+        each = ' '.join(f'{t * 1000:.0f}' for t in first)
+        print(f'{name:>14} {max(first) * 1000:>8.0f}ms {each + " ms":>30} '
+              f'{percentile(steady, 0.5) * 1000:>9.0f}ms {percentile(steady, 0.99) * 1000:>9.0f}ms')
+
+
+def bench_workers(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames)
+    frames = read_frames(video)
+
+    print(f'{os.cpu_count()} cores, {args.clients} concurrent clients')
+    print(f'{"workers":>8} {"startup":>8} {"frames":>7} {"fps":>7} {"speedup":>8} {"p50":>9}')
+    baseline = None
+    for workers in args.workers:
+        scheduler = app.InferenceScheduler(workers=workers)
+        app.inference_scheduler = scheduler
+        start = time.perf_counter()
+        scheduler.start()
+        scheduler.wait_ready()
+        app.run_model(frames[0])
+        startup = time.perf_counter() - start
+
+        latencies = []
+        stop = threading.Event()
+
+        def client(offset):
+            i = offset
+            while not stop.is_set():
+                begin = time.perf_counter()
+                app.run_model(frames[i % len(frames)])
+                latencies.append(time.perf_counter() - begin)
+                i += 1
+
+        threads = [threading.Thread(target=client, args=(i * 5,)) for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        fps = len(latencies) / args.seconds
+        baseline = baseline or fps
+        print(f'{workers:>8} {startup:>7.1f}s {len(latencies):>7} {fps:>7.1f} {fps / baseline:>7.2f}x '
+              f'{percentile(latencies, 0.5) * 1000:>7.0f}ms')
+
+        # Stop this configuration's worker processes before measuring the next one
+        for runner in scheduler.runners:
+            if isinstance(runner, app.InferenceWorker):
+                runner.process.terminate()
+
+
+def bench_frame_transport(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    video = args.video or make_sample_video(os.path.join(workdir, 'sample.mp4'), args.frames, tuple(args.size))
+
+    if not args.model:
+        # Fixed boxes instead of the model, so only the frame handling is measured
+        def run_model(frames):
+            boxes = app.Boxes(np.array([[100, 100, 400, 300]], dtype=np.float32),
+                              np.array([0.9], dtype=np.float32), np.array([0], dtype=np.float32))
+            return [app.DetectionResult(boxes, frame.shape[:2]) for frame in frames]
+        app.run_model = run_model
+
+    def legacy_step(captures, buffers, broadcasters, cameras):
+        # What the camera pipeline used to do: a fresh array per decode, a copy for
+        # inference and annotation, and tobytes() plus concatenation per encoded frame
+        batch = []
+        for camera_id, capture in zip(cameras, captures):
+            success, frame = capture.read()
+            if not success:
+                return False
+            buffers[camera_id].append(frame)
+            batch.append((camera_id, buffers[camera_id][-1].copy()))
+        results = app.run_model([frame for _, frame in batch])
+        for (camera_id, frame), result in zip(batch, results):
+            frame, detection = app.annotate_frame(frame, [result], camera_id)
+            ret, buffer = cv2.imencode('.jpg', frame)
+            broadcasters[camera_id] = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+                                       + buffer.tobytes() + b'\r\n')
+        return True
+
+    def ring_step(captures, readers, manager, processed):
+        for reader, capture in zip(readers, captures):
+            if not reader.read_frame(capture):
+                return False
+        manager.process_latest(processed)
+        return True
+
+    def run(mode, traced):
+        cameras = [f'bench-{i}' for i in range(args.cameras)]
+        captures = [cv2.VideoCapture(video) for _ in cameras]
+        if mode == 'copy':
+            buffers = {camera_id: collections.deque(maxlen=app.CAMERA_BUFFER_FRAMES) for camera_id in cameras}
+            broadcasters = {}
+            step = lambda: legacy_step(captures, buffers, broadcasters, cameras)
+        else:
+            manager = app.CaptureManager()
+            readers = []
+            for camera_id in cameras:
+                readers.append(app.CameraReader(camera_id, video, lambda: None))
+                manager.readers[camera_id] = readers[-1]
+                manager.broadcasters[camera_id] = app.FrameBroadcaster()
+                manager.broadcasters[camera_id].viewers = 1
+            processed = {}
+            step = lambda: ring_step(captures, readers, manager, processed)
+        # The first step sizes the ring; steady state is what matters
+        step()
+
+        peaks, times = [], []
+        while True:
+            if traced:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            if not step():
+                break
+            times.append(time.perf_counter() - start)
+            if traced:
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        for capture in captures:
+            capture.release()
+        app.snapshot_queue.join()
+        return peaks, times
+
+    frame_mb = args.size[0] * args.size[1] * 3 / 1e6
+    print(f'{args.cameras} cameras at {args.size[0]}x{args.size[1]} ({frame_mb:.1f} MB/frame), '
+          f'{"model" if args.model else "stub model"}')
+    print(f'{"mode":>6} {"steps":>6} {"peak MB/step":>13} {"MB/frame":>9} {"ms/step":>8} {"p95 ms":>7}')
+    for mode in ('copy', 'ring'):
+        tracemalloc.start()
+        peaks, _ = run(mode, traced=True)
+        tracemalloc.stop()
+        _, times = run(mode, traced=False)
+        peak = sum(peaks) / len(peaks) / 1e6
+        print(f'{mode:>6} {len(times):>6} {peak:>13.1f} {peak / args.cameras:>9.2f} '
+              f'{sum(times) / len(times) * 1000:>8.1f} {percentile(times, 0.95) * 1000:>7.1f}')
+
+
+def bench_postprocess(args):
+    import math
+    import app
+
+    def per_box(results):
+        # The old extract_detections: a conversion and threshold check per box
+        detections = []
+        for r in results:
+            for box in r.boxes:
+                x1, y1, x2, y2 = box.xyxy[0]
+                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+                conf = math.ceil((box.conf[0] * 100)) / 100
+                cls = int(box.cls[0])
+                if conf > 0.3:
+                    detections.append((x1, y1, x2, y2, conf, cls))
+        return detections
+
+    rng = np.random.default_rng(0)
+    print(f'{"boxes":>6} {"per-box":>10} {"vectorized":>11} {"speedup":>8} {"same":>5}')
+    for count in args.boxes:
+        corners = rng.uniform(0, 1920, (count, 2)).astype(np.float32)
+        xyxy = np.concatenate([corners, corners + rng.uniform(10, 200, (count, 2)).astype(np.float32)], axis=1)
+        conf = rng.uniform(0.25, 1, count).astype(np.float32)
+        cls = rng.integers(0, len(app.class_labels), count).astype(np.float32)
+        results = [app.DetectionResult(app.Boxes(xyxy, conf, cls), (1080, 1920))]
+
+        timings = {}
+        for name, extract in (('per-box', per_box), ('vectorized', app.extract_detections)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                extract(results)
+            timings[name] = (time.perf_counter() - start) / args.repeat
+        same = per_box(results) == app.extract_detections(results)
+        print(f'{count:>6} {timings["per-box"] * 1000:>8.3f}ms {timings["vectorized"] * 1000:>9.3f}ms '
+              f'{timings["per-box"] / timings["vectorized"]:>7.1f}x {str(same):>5}')
+
+
+def write_sample_snapshots(folder, count, prefix):
+    """Write count 1920x1080 snapshots built from the images in Media/ and return their names"""
+    sources = [cv2.imread(os.path.join(MEDIA_FOLDER, name)) for name in sorted(os.listdir(MEDIA_FOLDER))]
+    sources = [image for image in sources if image is not None]
+    names = []
+    for i in range(count):
+        name = f'{prefix}_{i:04d}.jpg'
+        cv2.imwrite(os.path.join(folder, name), cv2.resize(sources[i % len(sources)], (1920, 1080)))
+        names.append(name)
+    return names
+
+
+def bench_thumbnails(args):
+    import app
+
+    # Full resolution snapshots like the ones the camera pipeline writes
+    names = write_sample_snapshots(app.UPLOAD_FOLDER, args.images, 'bench_thumbnail')
+
+    client = app.app.test_client()
+
+    def fetch(url, headers=None):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers or {})
+        return response, time.perf_counter() - start
+
+    try:
+        full = [fetch(f'/view_image/uploads/{name}') for name in names]
+        full_bytes = sum(len(response.data) for response, _ in full) / len(full)
+        print(f'{len(names)} 1920x1080 snapshots, {full_bytes / 1024:.0f} KB each on average')
+        print(f'{"variant":>10} {"KB":>7} {"fewer":>7} {"first ms":>9} {"cached ms":>10} {"304":>5}')
+        print(f'{"original":>10} {full_bytes / 1024:>7.1f} {1:>6.1f}x '
+              f'{sum(t for _, t in full) / len(full) * 1000:>9.1f} {"-":>10} {"-":>5}')
+        for width in args.widths:
+            query = f'?w={width}&q={args.quality}'
+            first = [fetch(f'/view_image/uploads/{name}{query}') for name in names]
+            cached = [fetch(f'/view_image/uploads/{name}{query}') for name in names]
+            revalidated = [fetch(f'/view_image/uploads/{name}{query}', {'If-None-Match': response.headers['ETag']})
+                           for name, (response, _) in zip(names, cached)]
+            variant_bytes = sum(len(response.data) for response, _ in cached) / len(cached)
+            not_modified = all(response.status_code == 304 for response, _ in revalidated)
+            print(f'{f"w={width}":>10} {variant_bytes / 1024:>7.1f} {full_bytes / variant_bytes:>6.1f}x '
+                  f'{sum(t for _, t in first) / len(first) * 1000:>9.1f} '
+                  f'{sum(t for _, t in cached) / len(cached) * 1000:>10.1f} {str(not_modified):>5}')
+        print('cache:', app.thumbnail_cache.stats())
+    finally:
+        for name in names:
+            os.remove(os.path.join(app.UPLOAD_FOLDER, name))
+
+
+def bench_image_index(args):
+    import shutil
+    import app
+
+    def legacy_lookup(folder, name_part):
+        # The old fallback: list the folder and check every name
+        for file in os.listdir(folder):
+            if name_part in file and file.lower().endswith(app.IMAGE_EXTENSIONS):
+                return os.path.join(folder, file)
+        return None
+
+    def timed(lookup, fragments):
+        start = time.perf_counter()
+        for fragment in fragments:
+            lookup(fragment)
+        return (time.perf_counter() - start) / len(fragments) * 1000
+
+    print(f'{"files":>8} {"build s":>8} {"MB":>6} {"scan hit":>10} {"index hit":>10} '
+          f'{"scan miss":>10} {"index miss":>11} {"exact":>8} {"add":>8}')
+    for count in args.files:
+        folder = tempfile.mkdtemp(prefix='bench_index_')
+        try:
+            # Snapshot names as save_snapshot writes them, one second apart
+            names = [f'detection_{datetime.fromtimestamp(1.7e9 + i):%Y-%m-%d_%H-%M-%S}-000_{i:06d}.jpg'
+                     for i in range(count)]
+            for name in names:
+                open(os.path.join(folder, name), 'wb').close()
+
+            index = app.ImageIndex()
+            start = time.perf_counter()
+            index.folder(folder)
+            build = time.perf_counter() - start
+            tracemalloc.start()
+            app.ImageIndex().folder(folder)
+            memory = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+            rng = np.random.default_rng(0)
+            picks = [names[i] for i in rng.integers(0, count, args.lookups)]
+            hits = [os.path.splitext(name)[0] for name in picks]
+            misses = [f'detection_missing_{i}' for i in range(args.lookups)]
+            # A full scan per lookup is slow at 1M files, so time fewer of them
+            legacy_runs = max(1, args.lookups * 10000 // count)
+
+            scan_hit = timed(lambda fragment: legacy_lookup(folder, fragment), hits[:legacy_runs])
+            index_hit = timed(lambda fragment: index.find_prefix(folder, fragment), hits)
+            scan_miss = timed(lambda fragment: legacy_lookup(folder, fragment), misses[:legacy_runs])
+            index_miss = timed(lambda fragment: index.find_prefix(folder, fragment), misses)
+            exact = timed(lambda name: index.find(folder, name), picks)
+            added = [os.path.join(folder, f'detection_added_{i:06d}.jpg') for i in range(args.lookups)]
+            add = timed(index.add, added)
+            print(f'{count:>8} {build:>8.2f} {memory:>6.0f} {scan_hit:>8.2f}ms {index_hit:>8.3f}ms '
+                  f'{scan_miss:>8.2f}ms {index_miss:>9.3f}ms {exact:>6.3f}ms {add:>6.3f}ms')
+        finally:
+            shutil.rmtree(folder)
+
+
+def parse_image_batch(data):
+    """Split an /images/batch response body into (header, image bytes) pairs"""
+    images = []
+    offset = 0
+    while offset < len(data):
+        header_length = int.from_bytes(data[offset:offset + 4], 'big')
+        header = json.loads(data[offset + 4:offset + 4 + header_length])
+        offset += 4 + header_length
+        images.append((header, data[offset:offset + header['length']]))
+        offset += header['length']
+    return images
+
+
+def bench_image_batch(args):
+    import base64
+    import app
+
+    names = write_sample_snapshots(app.UPLOAD_FOLDER, args.images, 'bench_batch')
+    paths = [f'uploads/{name}' for name in names]
+    client = app.app.test_client()
+
+    def streamed(url, keep, **kwargs):
+        # Read the body chunk by chunk; without keep only the server's own buffers take memory
+        response = client.open(url, buffered=False, **kwargs)
+        size = 0
+        chunks = []
+        for chunk in response.response:
+            size += len(chunk)
+            if keep:
+                chunks.append(chunk)
+        response.close()
+        return b''.join(chunks), size
+
+    def base64_requests(keep=True):
+        size = 0
+        images = []
+        for path in paths:
+            body, length = streamed(f'/get_image_base64/{path}', keep)
+            size += length
+            if keep:
+                images.append(base64.b64decode(json.loads(body)['image_data']))
+        return images, size
+
+    def batch_request(query='', keep=True):
+        body, size = streamed(f'/images/batch{query}', keep, method='POST', json={'paths': paths})
+        return [data for header, data in parse_image_batch(body)], size
+
+    modes = [('base64', base64_requests), ('batch', batch_request),
+             (f'batch w={args.width}', lambda keep=True: batch_request(f'?w={args.width}&q=70', keep))]
+    batch_request(f'?w={args.width}&q=70')
+
+    originals = [open(os.path.join(app.UPLOAD_FOLDER, name), 'rb').read() for name in names]
+    print(f'{len(names)} 1920x1080 snapshots, {sum(map(len, originals)) / 1024:.0f} KB on disk')
+    print(f'{"mode":>12} {"requests":>9} {"KB sent":>8} {"overhead":>9} {"ms":>7} {"server KB":>10} {"same":>5}')
+    try:
+        for mode, fetch in modes:
+            start = time.perf_counter()
+            images, size = fetch()
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            fetch(keep=False)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            payload = sum(map(len, images))
+            same = images == originals if mode != f'batch w={args.width}' else '-'
+            print(f'{mode:>12} {len(names) if mode == "base64" else 1:>9} {size / 1024:>8.0f} '
+                  f'{(size - payload) / payload * 100:>8.1f}% {elapsed * 1000:>7.1f} '
+                  f'{peak / 1024:>10.0f} {str(same):>5}')
+    finally:
+        for name in names:
+            os.remove(os.path.join(app.UPLOAD_FOLDER, name))
+
+
+def bulk_detections(prefix, count):
+    return [{'timestamp': f'{prefix}-{i:07d}', 'class': 'garbage', 'confidence': 0.5,
+             'camera_id': 'cam1', 'zone_name': 'Zone A', 'location': 'Gate'} for i in range(count)]
+
+
+def bench_bulk_ingest(args):
+    import app
+
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    app.DB_PATH = os.path.join(workdir, 'bulk.db')
+    app.init_db()
+    app.db_pool = app.ConnectionPool(app.DB_PATH, app.DB_POOL_SIZE)
+    client = app.app.test_client()
+
+    print(f'{"rows":>8} {"mode":>8} {"requests":>9} {"seconds":>8} {"rows/s":>8} {"stored":>7}')
+    for size in args.sizes:
+        # Single posts are timed on at most --single-rows detections; their rows/s does not depend on size
+        single = bulk_detections(f'single-{size}', min(size, args.single_rows))
+        start = time.perf_counter()
+        for detection in single:
+            client.post('/api/detections', json=detection)
+        modes = [('single', len(single), len(single), time.perf_counter() - start)]
+
+        detections = bulk_detections(f'json-{size}', size)
+        start = time.perf_counter()
+        response = client.post('/api/detections/bulk', json=detections)
+        modes.append(('json', size, 1, time.perf_counter() - start))
+        assert response.get_json()['inserted'] == size
+
+        body = ''.join(json.dumps(detection) + '\n' for detection in bulk_detections(f'ndjson-{size}', size))
+        start = time.perf_counter()
+        response = client.post('/api/detections/bulk', data=body, content_type='application/x-ndjson')
+        modes.append(('ndjson', size, 1, time.perf_counter() - start))
+        assert response.get_json()['inserted'] == size
+
+        conn = app.get_db_connection()
+        try:
+            for mode, rows, requests, elapsed in modes:
+                stored = conn.execute('SELECT COUNT(*) FROM detections WHERE timestamp LIKE ?',
+                                      (f'{mode}-{size}-%',)).fetchone()[0]
+                print(f'{size:>8} {mode:>8} {requests:>9} {elapsed:>8.2f} {rows / elapsed:>8.0f} {stored:>7}')
+        finally:
+            app.release_db_connection(conn)
+        app.detection_history.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    video_batch = subparsers.add_parser('video-batch', help='frames/sec of process_video_file per batch size')
+    video_batch.add_argument('--video', help='video to process (default: a clip built from Media/)')
+    video_batch.add_argument('--frames', type=int, default=64, help='length of the generated clip')
+    video_batch.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+    video_batch.set_defaults(func=bench_video_batch)
+
+    video_pipeline = subparsers.add_parser('video-pipeline', help='serial loop vs the threaded process_video_file')
+    video_pipeline.add_argument('--video', help='video to process (default: a clip built from Media/)')
+    video_pipeline.add_argument('--frames', type=int, default=64, help='length of the generated clip')
+    video_pipeline.add_argument('--batch-size', type=int, default=8)
+    video_pipeline.set_defaults(func=bench_video_pipeline)
+
+    video_stride = subparsers.add_parser('video-stride', help='inference calls saved vs recall lost per stride')
+    video_stride.add_argument('--video', help='video to process (default: a clip built from Media/)')
+    video_stride.add_argument('--frames', type=int, default=64, help='length of the generated clip')
+    video_stride.add_argument('--batch-size', type=int, default=8)
+    video_stride.add_argument('--strides', nargs='+', default=['1', '2', '3', '5', '10', 'auto'],
+                              help='strides to compare; the first one is the recall reference')
+    video_stride.set_defaults(func=bench_video_stride)
+
+    snapshots = subparsers.add_parser('snapshots', help='disk bytes and fps with per-detection vs per-frame snapshots')
+    snapshots.add_argument('--video', help='video to process (default: a clip built from Media/)')
+    snapshots.add_argument('--frames', type=int, default=64, help='length of the generated clip')
+    snapshots.add_argument('--batch-size', type=int, default=8)
+    snapshots.set_defaults(func=bench_snapshots)
+
+    db_load = subparsers.add_parser('db-load', help='read/write latency of the detections store under load')
+    db_load.add_argument('--readers', type=int, default=16, help='concurrent reader threads')
+    db_load.add_argument('--seconds', type=float, default=5)
+    db_load.add_argument('--rows', type=int, default=500, help='detections to seed the database with')
+    db_load.add_argument('--write-rate', type=float, default=50, help='writes per second from the writer thread')
+    db_load.set_defaults(func=bench_db_load)
+
+    db_query = subparsers.add_parser('db-query', help='paginated, filtered detection queries as the table grows')
+    db_query.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    db_query.set_defaults(func=bench_db_query)
+
+    scheduler = subparsers.add_parser('scheduler', help='per-frame model calls vs the batching scheduler')
+    scheduler.add_argument('--video', help='video to take frames from (default: a clip built from Media/)')
+    scheduler.add_argument('--frames', type=int, default=64, help='length of the generated clip')
+    scheduler.add_argument('--streams', type=int, default=8, help='simulated camera streams')
+    scheduler.add_argument('--seconds', type=float, default=10)
+    scheduler.set_defaults(func=bench_scheduler)
+
+    backends = subparsers.add_parser('backends', help='load time, latency, throughput, memory and boxes per backend')
+    backends.add_argument('--video', help='video to take frames from (default: a clip built from Media/)')
+    backends.add_argument('--frames', type=int, default=16, help='length of the generated clip')
+    backends.add_argument('--backends', nargs='+', default=['torch', 'onnx'],
+                          help='backends to compare; the first one is the reference for the boxes')
+    backends.add_argument('--runs', type=int, default=20, help='single-frame calls to time')
+    backends.add_argument('--worker', help=argparse.SUPPRESS)
+    backends.add_argument('--output', help=argparse.SUPPRESS)
+    backends.set_defaults(func=bench_backends)
+
+    quantization = subparsers.add_parser('quantization', help='per-class precision/recall of the INT8 model vs FP32')
+    quantization.add_argument('--images', nargs='+', default=['Media', 'processed_photos'],
+                              help='folders of images to compare the models on')
+    quantization.add_argument('--limit', type=int, default=500, help='most images to use')
+    quantization.add_argument('--iou', type=float, default=0.5, help='IoU for an INT8 box to match an FP32 box')
+    quantization.set_defaults(func=bench_quantization)
+
+    cold_start = subparsers.add_parser('cold-start', help='seconds from starting the server to its first /ping')
+    cold_start.add_argument('--app-dir', default='.', help='checkout of the app to start (e.g. an older version)')
+    cold_start.add_argument('--runs', type=int, default=3)
+    cold_start.set_defaults(func=bench_cold_start)
+
+    first_request = subparsers.add_parser('first-request', help='first vs steady /detect latency per warm-up setting')
+    first_request.add_argument('--app-dir', default='.', help='checkout of the app to start')
+    first_request.add_argument('--sizes', type=lambda value: tuple(int(v) for v in value.split('x')), nargs='+',
+                               default=[(640, 480), (1280, 720), (1920, 1080)], help='upload sizes as WxH')
+    first_request.add_argument('--repeat', type=int, default=10, help='steady-state requests per size')
+    first_request.set_defaults(func=bench_first_request)
+
+    workers = subparsers.add_parser('workers', help='inference throughput per number of worker processes')
+    workers.add_argument('--video', help='video to take frames from (default: a clip built from Media/)')
+    workers.add_argument('--frames', type=int, default=32, help='length of the generated clip')
+    workers.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4],
+                         help='worker process counts to compare; 0 runs the model in this process')
+    workers.add_argument('--clients', type=int, default=8, help='threads submitting frames concurrently')
+    workers.add_argument('--seconds', type=float, default=10)
+    workers.set_defaults(func=bench_workers)
+
+    frame_transport = subparsers.add_parser('frame-transport',
+                                            help='per-frame allocations of the camera pipeline: copies vs the frame ring')
+    frame_transport.add_argument('--video', help='video every camera reads (default: a clip built from Media/)')
+    frame_transport.add_argument('--frames', type=int, default=60, help='length of the generated clip')
+    frame_transport.add_argument('--size', type=int, nargs=2, default=[1920, 1080], help='generated clip size')
+    frame_transport.add_argument('--cameras', type=int, default=4)
+    frame_transport.add_argument('--model', action='store_true', help='run the real model instead of fixed boxes')
+    frame_transport.set_defaults(func=bench_frame_transport)
+
+    postprocess = subparsers.add_parser('postprocess', help='per-frame box post-processing time vs box count')
+    postprocess.add_argument('--boxes', type=int, nargs='+', default=[1, 10, 100, 300, 1000])
+    postprocess.add_argument('--repeat', type=int, default=200, help='calls timed per box count')
+    postprocess.set_defaults(func=bench_postprocess)
+
+    thumbnails = subparsers.add_parser('thumbnails', help='bytes and latency of resized image variants vs originals')
+    thumbnails.add_argument('--images', type=int, default=20, help='snapshots generated from Media/')
+    thumbnails.add_argument('--widths', type=int, nargs='+', default=[320, 480])
+    thumbnails.add_argument('--quality', type=int, default=70)
+    thumbnails.set_defaults(func=bench_thumbnails)
+
+    image_index = subparsers.add_parser('image-index', help='image lookup fallbacks: directory scans vs the name index')
+    image_index.add_argument('--files', type=int, nargs='+', default=[10000, 100000, 1000000])
+    image_index.add_argument('--lookups', type=int, default=200, help='lookups timed per folder size')
+    image_index.set_defaults(func=bench_image_index)
+
+    image_batch = subparsers.add_parser('image-batch', help='size and latency of /get_image_base64 vs /images/batch')
+    image_batch.add_argument('--images', type=int, default=20, help='snapshots generated from Media/')
+    image_batch.add_argument('--width', type=int, default=480, help='width of the resized batch')
+    image_batch.set_defaults(func=bench_image_batch)
+
+    bulk_ingest = subparsers.add_parser('bulk-ingest', help='rows/s of single /api/detections posts vs /api/detections/bulk')
+    bulk_ingest.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    bulk_ingest.add_argument('--single-rows', type=int, default=2000, help='most detections posted one at a time per size')
+    bulk_ingest.set_defaults(func=bench_bulk_ingest)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Container, 
   Box, 
@@ -77,19 +77,44 @@ function AppContent() {
     avatar: 'JD'
   });
 
+  // Detections synced so far, keyed by event_id, and the server process and version they are at
+  const logsRef = useRef(new Map());
+  const versionRef = useRef(0);
+  const bootRef = useRef('');
+
   useEffect(() => {
     fetchTasks();
-    const interval = setInterval(fetchTasks, 5000);
-    return () => clearInterval(interval);
+    // Sync as soon as the server pushes an event; the slow poll is only a fallback
+    const events = new EventSource(`${FLASK_SERVER}/events`);
+    ['detection', 'status', 'bulk', 'overflow'].forEach(type => events.addEventListener(type, fetchTasks));
+    const interval = setInterval(fetchTasks, 30000);
+    return () => {
+      events.close();
+      clearInterval(interval);
+    };
   }, [selectedZone]);
 
   const fetchTasks = async () => {
     try {
-      const response = await fetch(`${FLASK_SERVER}/get_logs`);
+      // Only fetch detections created or changed since the last poll
+      const response = await fetch(`${FLASK_SERVER}/get_logs/changes?since=${versionRef.current}&boot=${bootRef.current}`);
       if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
       
       const data = await response.json();
-      const zoneTasks = data.filter(task => 
+      // A new boot id means the server restarted and its versions started again
+      if (data.reset || data.boot_id !== bootRef.current) {
+        logsRef.current = new Map();
+      }
+      bootRef.current = data.boot_id;
+      data.changes.forEach(log => logsRef.current.set(log.event_id, log));
+      // Drop detections that have aged out of the server's history
+      const current = new Set(data.ids);
+      Array.from(logsRef.current.keys()).forEach(id => {
+        if (!current.has(id)) logsRef.current.delete(id);
+      });
+      versionRef.current = data.version;
+
+      const zoneTasks = Array.from(logsRef.current.values()).filter(task => 
         task.forCleaning && 
         task.zone_name === selectedZone
       );
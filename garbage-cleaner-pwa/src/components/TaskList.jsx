@@ -68,7 +68,7 @@ const TaskList = ({ tasks, onTaskComplete }) => {
     <List>
       {tasks.map((task) => (
         <StyledListItem
-          key={task.timestamp}
+          key={task.event_id ?? task.timestamp}
           secondaryAction={
             <Box sx={{ display: 'flex', alignItems: 'center', gap: 1 }}>
               <Tooltip title={task.status === 'cleaned' ? 'Mark as pending' : 'Mark as cleaned'}>
@@ -8,6 +8,7 @@ class Detection {
   final String status;
   final String imagePath;
   final String imageUrl;
+  final String thumbnailUrl;
   final bool forCleaning;
   final String cameraId;
   final String zoneName;
@@ -23,6 +24,7 @@ class Detection {
     required this.status,
     required this.imagePath,
     required this.imageUrl,
+    this.thumbnailUrl = '',
     required this.forCleaning,
     required this.cameraId,
     required this.zoneName,
@@ -76,6 +78,7 @@ class Detection {
       status: json['status'] ?? 'pending',
       imagePath: imagePath,
       imageUrl: imageUrl, // Use the constructed or provided URL
+      thumbnailUrl: json['thumbnail_url'] ?? '',
       forCleaning: json['forCleaning'] ?? false,
       cameraId: json['camera_id'] ?? 'unknown',
       zoneName: json['zone_name'] ?? 'Unknown Zone',
@@ -94,6 +97,7 @@ class Detection {
       'status': status,
       'image_path': imagePath,
       'image_url': imageUrl,
+      'thumbnail_url': thumbnailUrl,
       'forCleaning': forCleaning,
       'camera_id': cameraId,
       'zone_name': zoneName,
@@ -106,6 +110,9 @@ class Detection {
   
   bool get isCleaned => status == 'cleaned';
 
+  // Smaller server-resized copy for list views, falling back to the full image
+  String get listImageUrl => thumbnailUrl.isNotEmpty ? thumbnailUrl : imageUrl;
+
   // Simplified getter for effective image URL
   String get effectiveImageUrl {
     // If we're using the test mode from API service, prefer the test URL
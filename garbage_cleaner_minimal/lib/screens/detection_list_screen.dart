@@ -450,7 +450,7 @@ class _DetectionListScreenState extends State<DetectionListScreen> {
             AspectRatio(
               aspectRatio: 16/9,
               child: Image.network(
-                detection.imageUrl,
+                detection.listImageUrl,
                 fit: BoxFit.cover,
                 loadingBuilder: (context, child, loadingProgress) {
                   if (loadingProgress == null) return child;
@@ -1,5 +1,6 @@
 import 'dart:convert';
 import 'dart:io';
+import 'dart:typed_data';
 import 'package:http/http.dart' as http;
 import 'package:http/io_client.dart'; // Import IOClient
 import '../models/detection.dart';
@@ -680,6 +681,49 @@ class ApiService {
     }
   }
   
+  // Fetch several images in one /images/batch request as raw bytes, keyed by the
+  // requested path; missing images are left out. width/quality ask for resized copies.
+  Future<Map<String, Uint8List>> getImageBatch(List<String> imagePaths, {int? width, int? quality}) async {
+    final images = <String, Uint8List>{};
+    if (imagePaths.isEmpty) return images;
+    
+    final query = <String, String>{
+      if (width != null) 'w': '$width',
+      if (quality != null) 'q': '$quality',
+    };
+    try {
+      final uri = Uri.parse('$baseUrl/images/batch').replace(queryParameters: query.isEmpty ? null : query);
+      final response = await _client.post(
+        uri,
+        headers: {'Content-Type': 'application/json'},
+        body: json.encode({'paths': imagePaths}),
+      ).timeout(const Duration(seconds: 30));
+      if (response.statusCode != 200) {
+        debugPrint("Image batch failed with status: ${response.statusCode}");
+        return images;
+      }
+      
+      // Each image: 4 byte big-endian header length, JSON header, then header['length'] image bytes
+      final bytes = response.bodyBytes;
+      final view = ByteData.sublistView(bytes);
+      var offset = 0;
+      while (offset + 4 <= bytes.length) {
+        final headerLength = view.getUint32(offset);
+        final header = json.decode(utf8.decode(bytes.sublist(offset + 4, offset + 4 + headerLength)));
+        offset += 4 + headerLength;
+        final int length = header['length'];
+        if (header['status'] == 'ok') {
+          images[header['path']] = Uint8List.sublistView(bytes, offset, offset + length);
+        }
+        offset += length;
+      }
+      debugPrint("Fetched ${images.length} of ${imagePaths.length} images in one batch");
+    } catch (e) {
+      debugPrint("Error fetching image batch: $e");
+    }
+    return images;
+  }
+  
   // Fallback to a built-in base64 image of a placeholder
   static String getPlaceholderImageBase64() {
     // This is a very small base64-encoded placeholder image
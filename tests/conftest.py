@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing app initializes its database and thumbnail cache, so point them away from the checkout
+import_dir = tempfile.mkdtemp(prefix='app_tests_')
+os.environ.setdefault('DB_PATH', os.path.join(import_dir, 'detections.db'))
+os.environ.setdefault('THUMBNAIL_FOLDER', os.path.join(import_dir, 'thumbnails'))
+
+import app as app_module
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app module with its database, upload folders and in-memory history in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    for folder in (app_module.UPLOAD_FOLDER, app_module.PROCESSED_FOLDER, app_module.PROCESSED_PHOTOS_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+    monkeypatch.setattr(app_module, 'DB_PATH', str(tmp_path / 'detections.db'))
+    app_module.init_db()
+    monkeypatch.setattr(app_module, 'db_pool', app_module.ConnectionPool(app_module.DB_PATH, app_module.DB_POOL_SIZE))
+    monkeypatch.setattr(app_module, 'detection_history', [])
+    monkeypatch.setattr(app_module, 'image_index', app_module.ImageIndex())
+    yield app_module
+    app_module.snapshot_queue.join()
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+
+class FakeBoxes(SimpleNamespace):
+    def __len__(self):
+        return len(self.conf)
+
+
+def fake_results(boxes):
+    """Model results holding the given (x1, y1, x2, y2, confidence, class index) boxes"""
+    boxes = np.array(boxes, dtype=np.float32).reshape(-1, 6)
+    return [SimpleNamespace(boxes=FakeBoxes(xyxy=boxes[:, :4], conf=boxes[:, 4], cls=boxes[:, 5]))]
+
+
+@pytest.fixture
+def fake_model(app, monkeypatch):
+    """Make run_model return the boxes in fake_model.boxes instead of loading the model"""
+    model = SimpleNamespace(boxes=[])
+    monkeypatch.setattr(app, 'run_model', lambda source: fake_results(model.boxes))
+    return model
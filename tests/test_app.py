@@ -0,0 +1,224 @@
+import io
+import os
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+import pytest
+
+
+def jpeg_upload(name):
+    ok, data = cv2.imencode('.jpg', np.zeros((120, 160, 3), dtype=np.uint8))
+    return {'photo': (io.BytesIO(data.tobytes()), name)}
+
+
+def test_photo_uploads_are_separate_events(app, client, fake_model):
+    fake_model.boxes = [(10, 10, 60, 60, 0.9, 0)]
+    first = client.post('/process_photo', data=jpeg_upload('first.jpg'), content_type='multipart/form-data')
+    second = client.post('/process_photo', data=jpeg_upload('second.jpg'), content_type='multipart/form-data')
+    
+    assert first.status_code == 200 and second.status_code == 200
+    assert len(app.detection_history) == 2
+    first_event, second_event = app.detection_history
+    assert first_event['image_path'] != second_event['image_path']
+    assert first_event['frames_seen'] == second_event['frames_seen'] == 1
+
+
+def test_log_changes_list_current_history(app, client):
+    for i in range(105):
+        app.detection_history.append(app.mark_detection_changed({'timestamp': f'2024-01-01 00:00:{i:03d}'}))
+        if len(app.detection_history) > 100:
+            app.detection_history.pop(0)
+    
+    data = client.get('/get_logs/changes?since=0').get_json()
+    assert data['ids'] == [detection['event_id'] for detection in app.detection_history]
+    assert len(set(data['ids'])) == 100
+
+
+def test_tracked_object_bumps_version_on_new_peak_or_after_interval(app, monkeypatch):
+    tracker = app.DetectionTracker()
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    first = app.record_detections(frame, [(10, 10, 60, 60, 0.5, 0)], tracker=tracker)
+    version = first['version']
+    
+    again = app.record_detections(frame, [(12, 10, 62, 60, 0.8, 0)], tracker=tracker)
+    assert again is first
+    assert again['version'] > version
+    assert again['frames_seen'] == 2 and again['confidence'] == 0.8
+    
+    # Seen again without a new peak: no new version until the interval has passed
+    version = again['version']
+    app.record_detections(frame, [(12, 10, 62, 60, 0.7, 0)], tracker=tracker)
+    assert again['version'] == version and again['frames_seen'] == 3
+    monkeypatch.setattr(app, 'TRACK_VERSION_INTERVAL', 0)
+    app.record_detections(frame, [(12, 10, 62, 60, 0.7, 0)], tracker=tracker)
+    assert again['version'] > version
+
+
+def test_scheduler_batches_only_frames_of_one_shape(app):
+    import threading
+    
+    batches = []
+    
+    def runner(frames):
+        batches.append([frame.shape for frame in frames])
+        return [frame.shape for frame in frames]
+    
+    scheduler = app.InferenceScheduler(max_batch=4, max_wait=0.05, workers=0)
+    scheduler.runners = [runner]
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8), np.zeros((720, 1280, 3), dtype=np.uint8)] * 3
+    futures = [scheduler.submit(frame) for frame in frames]
+    threading.Thread(target=scheduler.run, args=(runner,), daemon=True).start()
+    
+    assert [future.result(timeout=5) for future in futures] == [frame.shape for frame in frames]
+    assert all(len(set(shapes)) == 1 for shapes in batches)
+    assert sorted(map(len, batches)) == [3, 3]
+
+
+def test_camera_resolution_change_frees_the_old_ring(app, monkeypatch):
+    class FakeCapture:
+        def __init__(self, shapes):
+            self.shapes = list(shapes)
+        
+        def read(self, out=None):
+            frame = np.zeros(self.shapes.pop(0), dtype=np.uint8)
+            if out is not None and out.shape == frame.shape:
+                out[...] = frame
+                return True, out
+            return True, frame
+    
+    reader = app.CameraReader('camera_test', None, lambda: None)
+    capture = FakeCapture([(48, 64, 3)] + [(96, 128, 3)] * (app.CAMERA_BUFFER_FRAMES + 1))
+    reader.read_frame(capture)
+    old_ring = reader.ring
+    sequence, held = reader.latest()
+    
+    reader.read_frame(capture)
+    assert reader.ring is not old_ring
+    assert old_ring in app.retired_rings
+    
+    # Still referenced downstream: the ring stays mapped and linked
+    for _ in range(app.CAMERA_BUFFER_FRAMES):
+        reader.read_frame(capture)
+    assert old_ring in app.retired_rings
+    
+    # Inference workers keep rings mapped until the server tells them the ring is gone
+    worker = app.InferenceWorker.__new__(app.InferenceWorker)
+    worker.dropped = app.collections.deque()
+    monkeypatch.setattr(app.inference_scheduler, 'runners', [worker])
+    held.ring.release(held.slot)
+    del held
+    app.close_retired_rings()
+    assert old_ring not in app.retired_rings
+    assert list(worker.dropped) == [old_ring.block.name]
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=old_ring.block.name)
+
+
+def test_database_listings_link_thumbnails(app, client):
+    app.save_detection_to_db({'timestamp': '2024-01-01T00:00:00', 'image_path': 'uploads/a.jpg'})
+    
+    for url in ('/api/detections', '/mobile/get_detections'):
+        detection, = client.get(url).get_json()['detections']
+        assert detection['thumbnail_url'] == (f"{detection['image_url']}?w={app.THUMBNAIL_LIST_WIDTH}"
+                                              f"&q={app.THUMBNAIL_LIST_QUALITY}")
+
+
+def test_image_batch_rejects_a_json_list_body(client):
+    response = client.post('/images/batch', json=['uploads/a.jpg'])
+    assert response.status_code == 400
+
+
+def test_image_batch_rejects_paths_that_are_not_a_list_of_strings(client):
+    assert client.post('/images/batch', json={'paths': 'uploads/a.jpg'}).status_code == 400
+    assert client.post('/images/batch', json={'paths': ['uploads/a.jpg', 3]}).status_code == 400
+    
+    response = client.post('/images/batch', json={'paths': ['uploads/missing.jpg']})
+    assert response.status_code == 200 and response.headers['X-Image-Count'] == '1'
+
+
+def test_bulk_ingest_reads_the_body_before_taking_the_write_lock(app, client):
+    import sqlite3
+    
+    class SlowUpload(io.BytesIO):
+        """An NDJSON body that arrives in small pieces, with another writer busy in between"""
+        writes = 0
+        
+        def readinto(self, buffer):
+            with sqlite3.connect(app.DB_PATH, timeout=0) as conn:
+                conn.execute('INSERT INTO detections (timestamp) VALUES (?)', (f'other-{self.writes}',))
+            self.writes += 1
+            return super().readinto(memoryview(buffer)[:16384])
+    
+    body = b''.join(f'{{"timestamp": "bulk-{i:05d}"}}\n'.encode() for i in range(12000))
+    response = client.post('/api/detections/bulk', input_stream=SlowUpload(body),
+                           content_type='application/x-ndjson', content_length=len(body))
+    assert response.status_code == 200
+    assert response.get_json()['inserted'] == 12000
+
+
+def test_bulk_ingest_keeps_history_capped_and_sends_one_event(app, client):
+    subscription = app.event_broker.subscribe(zone='Zone A')
+    try:
+        detections = [{'timestamp': f'bulk-{i:05d}', 'zone_name': 'Zone A'} for i in range(3000)]
+        assert client.post('/api/detections/bulk', json=detections).get_json()['inserted'] == 3000
+        
+        assert len(client.get('/get_logs').get_json()) == app.DETECTION_HISTORY_SIZE
+        events, dropped = subscription.wait(0)
+        assert [event['type'] for event in events] == ['bulk']
+        assert events[0]['detection']['count'] == 3000
+    finally:
+        app.event_broker.unsubscribe(subscription)
+
+
+def test_objects_seen_in_one_frame_get_distinct_event_ids(app):
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    app.record_detections(frame, [(10, 10, 60, 60, 0.9, 0), (80, 10, 150, 60, 0.8, 0)])
+    
+    first, second = app.detection_history
+    assert first['timestamp'] == second['timestamp']
+    assert first['event_id'] != second['event_id']
+
+
+def test_restart_changes_etags_and_resets_delta_clients(app, client, monkeypatch):
+    app.detection_history.append(app.mark_detection_changed({'timestamp': '2024-01-01 00:00:00'}))
+    first = client.get('/get_logs/changes?since=0&boot=')
+    data = first.get_json()
+    synced = f"/get_logs/changes?since={data['version']}&boot={data['boot_id']}"
+    assert data['reset'] and not client.get(synced).get_json()['reset']
+    logs_etag = client.get('/get_logs').headers['ETag']
+    
+    # A new process whose version has already moved past the client's
+    monkeypatch.setattr(app, 'BOOT_ID', 'restarted')
+    monkeypatch.setattr(app, 'history_version', app.history_version + 50)
+    assert client.get('/get_logs', headers={'If-None-Match': logs_etag}).status_code == 200
+    after = client.get(synced).get_json()
+    assert after['reset'] and after['boot_id'] == 'restarted'
+
+
+def test_export_child_import_has_no_server_side_effects(tmp_path):
+    import subprocess
+    import sys
+    
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    (tmp_path / 'thumbnails').mkdir()
+    (tmp_path / 'thumbnails' / 'variant.jpg.1234.tmp').write_bytes(b'partial')
+    env = {**os.environ, 'INFERENCE_BACKEND': 'none', 'DB_PATH': 'detections.db', 'THUMBNAIL_FOLDER': 'thumbnails'}
+    subprocess.run([sys.executable, '-c', f'import sys; sys.path.insert(0, {root!r}); import app'],
+                   cwd=tmp_path, env=env, check=True)
+    
+    assert not (tmp_path / 'detections.db').exists()
+    assert (tmp_path / 'thumbnails' / 'variant.jpg.1234.tmp').exists()
+
+
+def test_video_job_batch_size_is_clamped(app, client, fake_model):
+    response = client.post('/video_jobs', content_type='multipart/form-data',
+                           data={'video': (io.BytesIO(b'not a video'), 'clip.mp4'), 'batch_size': '5000'})
+    job_id = response.get_json()['job_id']
+    
+    conn = app.get_db_connection()
+    try:
+        row = conn.execute('SELECT batch_size FROM video_jobs WHERE job_id = ?', (job_id,)).fetchone()
+    finally:
+        app.release_db_connection(conn)
+    assert row['batch_size'] == app.INFERENCE_MAX_BATCH